@@ -0,0 +1,74 @@
+"""Measure gzip CPU cost against bandwidth saved on the largest pages.
+
+Usage: python benchmarks/compression.py [--messages 200] [--participants 200] [--repeat 20]
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat import create_app
+from chat.models import db, Category, Message, Room, User
+from config import Config, TestConfig
+
+
+class BenchmarkConfig(TestConfig):
+    """In-memory database with production page sizes and uncompressed responses."""
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    ROOMS_PER_PAGE = Config.ROOMS_PER_PAGE
+    MAX_MESSAGES_AVAILABLE = 10 ** 6
+    ARCHIVE_BATCH_SIZE = Config.ARCHIVE_BATCH_SIZE
+    COMPRESS_LEVEL = 0
+
+
+def populate(messages, participants):
+    """Create room with given number of messages and participants. Return room identifier."""
+    users = [User(username=f"user{i}", email=f"user{i}@example.com", name=f"User {i}") for i in range(participants)]
+    room = Room(name="Benchmark room", description="Room used to measure page sizes.",
+                creator=users[0], category=Category(name="Benchmarks"))
+    room.users.extend(users)
+    db.session.add(room)
+    db.session.commit()
+    for i in range(messages):
+        db.session.add(Message(text=f"Message number {i} sent to benchmark room.", sender=users[i % participants], room=room))
+    db.session.commit()
+    return room.room_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--participants", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    
+    app = create_app(BenchmarkConfig)
+    app.config["MESSAGES_PER_PAGE"] = args.messages
+    app.config["PARTICIPANTS_PER_PAGE"] = args.participants
+    with app.app_context():
+        db.create_all()
+        room_id = populate(args.messages, args.participants)
+        client = app.test_client()
+        pages = {
+            "index": "/",
+            "room": f"/rooms/{room_id}",
+            "messages json": f"/rooms/{room_id}/messages",
+            "participants json": f"/rooms/{room_id}/participants"
+        }
+        print(f"{'page':<18} {'level':>5} {'bytes':>9} {'gzip':>8} {'ratio':>6} {'ms':>7}")
+        for name, url in pages.items():
+            body = client.get(url).data
+            for level in (1, 6, 9):
+                start = time.perf_counter()
+                for _ in range(args.repeat):
+                    compressed = gzip.compress(body, level)
+                elapsed = (time.perf_counter() - start) / args.repeat * 1000
+                print(f"{name:<18} {level:>5} {len(body):>9} {len(compressed):>8} "
+                      f"{len(compressed) / len(body):>6.2f} {elapsed:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Measure concurrent message send throughput for each database engine profile.
+
+Every worker thread repeats the send path of the "new_message" event: load
+room, insert message, archive overflow and commit. SQLite profiles run
+against a temporary database file, PostgreSQL profiles against DATABASE_URL.
+
+Usage: python benchmarks/engine.py [--workers 8] [--messages 200] [--profiles default sqlite]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError
+
+from chat import create_app
+from chat.models import db, Category, Message, Room, User
+from config import Config
+
+
+def make_config(profile, uri):
+    """Return config class using given engine profile and database."""
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = uri
+        SQLALCHEMY_TRACK_MODIFICATIONS = False
+        ENGINE_PROFILE = profile
+        MESSAGE_LOG_DIR = None
+    return BenchmarkConfig
+
+
+def send_messages(app, room_id, user_id, count, errors):
+    """Send count messages to the room like "new_message" event handler does."""
+    with app.app_context():
+        for i in range(count):
+            try:
+                room = Room.query.get(room_id)
+                db.session.add(Message(text=f"Benchmark message {i}", sender_id=user_id, room=room))
+                room.clean()
+                db.session.commit()
+            except OperationalError:
+                db.session.rollback()
+                errors.append(i)
+        db.session.remove()
+
+
+def run(profile, uri, workers, messages):
+    """Return (messages per second, number of failed sends) for the profile."""
+    app = create_app(make_config(profile, uri))
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        users = [User(username=f"user{i}", email=f"user{i}@example.com") for i in range(workers)]
+        room = Room(name="Benchmark room", creator=users[0], category=Category(name="Benchmarks"))
+        room.users.extend(users)
+        db.session.add(room)
+        db.session.commit()
+        room_id, user_ids = room.room_id, [user.user_id for user in users]
+        db.session.remove()
+    errors = []
+    threads = [threading.Thread(target=send_messages, args=(app, room_id, user_id, messages, errors))
+               for user_id in user_ids]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    with app.app_context():
+        db.drop_all()
+        db.engine.dispose()
+    return (workers * messages - len(errors)) / elapsed, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--profiles", nargs="+", default=["default", "sqlite"])
+    args = parser.parse_args()
+    
+    print(f"{'profile':<12} {'msg/s':>9} {'failed':>7}")
+    for profile in args.profiles:
+        with tempfile.TemporaryDirectory() as tmp:
+            if profile.startswith("postgresql"):
+                uri = os.environ.get("DATABASE_URL", "").replace("postgres://", "postgresql://")
+                if not uri:
+                    print(f"{profile:<12} skipped, DATABASE_URL is not set")
+                    continue
+            else:
+                uri = "sqlite:///" + os.path.join(tmp, "benchmark.sqlite")
+            throughput, failed = run(profile, uri, args.workers, args.messages)
+            print(f"{profile:<12} {throughput:>9.1f} {failed:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Measure cold start time of web worker import and of flask cli commands.
+
+Every command is run in a fresh interpreter, so import time is included.
+Commands use temporary SQLite database with schema created before measurement.
+Time spent in application factory steps is printed by "flask startup".
+
+Usage: python benchmarks/startup.py [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMANDS = {
+    "web worker import": [sys.executable, "-c", "import run"],
+    "flask translate compile": [sys.executable, "-m", "flask", "translate", "compile"],
+    "flask drop-room": [sys.executable, "-m", "flask", "drop-room", "0"],
+    "flask db current": [sys.executable, "-m", "flask", "db", "current"]
+}
+
+
+# Schema is created directly, baseline migration uses ALTER COLUMN which SQLite does not support.
+CREATE_SCHEMA = "from run import app; from chat.models import db; app.app_context().push(); db.create_all()"
+
+
+def measure(args, repeat, env):
+    """Return median wall time of running command in seconds."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(args, cwd=root, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "FLASK_APP": "run.py", "PYTHONWARNINGS": "ignore",
+               "DATABASE_URL": "sqlite:///" + os.path.join(tmp, "startup.sqlite")}
+        subprocess.run([sys.executable, "-c", CREATE_SCHEMA], cwd=root, env=env, check=True)
+        for name, command in COMMANDS.items():
+            print(f"{name:<24} {measure(command, args.repeat, env) * 1000:8.1f} ms")
+        subprocess.run([sys.executable, "-m", "flask", "startup"], cwd=root, env=env)
+
+
+if __name__ == "__main__":
+    main()
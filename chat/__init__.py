@@ -1,2 +1,9 @@
 from .app import create_app
-from .extensions import sio
\ No newline at end of file
+
+
+def __getattr__(name):
+    # Extensions are imported on first access, so importing package stays cheap.
+    if name == "sio":
+        from .extensions import sio
+        return sio
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,28 +1,79 @@
+import time
+from contextlib import contextmanager
+
 from flask import Flask
+from sqlalchemy.engine import make_url
 from config import Config
-from .models import db, participants, Category, Message, Room, User
 
 
-def create_app(config=Config):
-    """Flask application factory.
+@contextmanager
+def timed(report, step):
+    """Append (step, seconds) pair to startup report when block is finished.
+    
+    :param report: list of timed steps.
+    :param step: step name.
+    """
+    started = time.perf_counter()
+    yield
+    report.append((step, time.perf_counter() - started))
+
+
+def create_app(config=Config, blueprints=True, migrations=True):
+    """Flask application factory. Time spent in every startup step is kept in
+    app.extensions["startup"] as list of (step, seconds) pairs.
     
     :param config: application config.
+    :param blueprints: register blueprints, commands which do not serve pages can skip them.
+    :param migrations: register Flask-Migrate, only "flask db" commands need it.
     """
-    app = Flask(__name__)
-    app.config.from_object(config)
+    report = []
+    with timed(report, "config"):
+        app = Flask(__name__)
+        app.config.from_object(config)
+        apply_engine_profile(app)
+    
+    # Registered first, so compression hook runs after all other after_request hooks.
+    with timed(report, "compression"):
+        from .compression import compress
+        compress.init_app(app)
     
-    register_blueprints(app)
-    register_extensions(app)
+    if blueprints:
+        with timed(report, "blueprints"):
+            register_blueprints(app)
+    with timed(report, "extensions"):
+        register_extensions(app, migrations)
     
     @app.shell_context_processor
     def shell_context():
         """Register shell context."""
+        from .models import db, participants, Category, Message, Room, User
         return {"db": db, "participants": participants, "Category": Category, 
                 "Message": Message, "Room": Room, "User": User}
     
+    app.extensions["startup"] = report
+    app.logger.debug("Application created in %.1f ms.", sum(seconds for _, seconds in report) * 1000)
     return app 
 
 
+def apply_engine_profile(app):
+    """Merge named engine profile into SQLAlchemy engine options. Options set
+    explicitly in SQLALCHEMY_ENGINE_OPTIONS take precedence.
+    """
+    url = make_url(app.config.get("SQLALCHEMY_DATABASE_URI") or "sqlite://")
+    name = app.config.get("ENGINE_PROFILE")
+    if name is None:
+        # In-memory SQLite database lives in single connection, pooling options do not apply.
+        in_memory = url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+        name = "default" if in_memory else url.get_backend_name()
+    profiles = app.config.get("ENGINE_PROFILES", {})
+    if app.config.get("ENGINE_PROFILE") and name not in profiles:
+        raise ValueError(f"Unknown engine profile: {name}.")
+    profile = profiles.get(name, {})
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {**profile.get("engine", {}), 
+                                               **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})}
+    app.config.setdefault("SQLALCHEMY_PRAGMAS", profile.get("pragmas", {}))
+
+
 def register_blueprints(app):
     """Register application blueprints."""
     from .main import main
@@ -38,19 +89,26 @@ def register_blueprints(app):
     app.register_blueprint(users)
     
     
-def register_extensions(app):
-    """Register application extensions."""
+def register_extensions(app, migrations=True):
+    """Register application extensions.
+    
+    :param migrations: register Flask-Migrate, importing alembic.
+    """
     from .extensions import babel 
     babel.init_app(app)
     
+    from .i18n import translations
+    translations.init_app(app)
+    
     from .extensions import db 
     db.init_app(app)
     
     from .extensions import login_manager
     login_manager.init_app(app)
 
-    from .extensions import migrate
-    migrate.init_app(app, db)
+    if migrations:
+        from .extensions import migrate
+        migrate.init_app(app, db)
     
     from .extensions import mail
     mail.init_app(app)
@@ -59,5 +117,38 @@ def register_extensions(app):
     moment.init_app(app)
     
     from .extensions import sio 
-    sio.init_app(app)
-    
\ No newline at end of file
+    sio.init_app(app, http_compression=bool(app.config.get("COMPRESS_LEVEL", 6)),
+                 compression_threshold=app.config.get("COMPRESS_MIN_SIZE", 500))
+    
+    from .profiles import profiles
+    profiles.init_app(app)
+    
+    from .ratelimit import limiter
+    limiter.init_app(app)
+    
+    from .presence import presence
+    presence.init_app(app)
+    
+    from .msglog import msglog
+    msglog.init_app(app)
+    
+    from .fragments import fragments
+    fragments.init_app(app)
+        
+    from .conditional import conditional
+    conditional.init_app(app)
+    
+    from .assets import assets
+    assets.init_app(app)
+    
+    from .categories import categories
+    categories.init_app(app)
+    
+    from .trending import trending
+    trending.init_app(app)
+    
+    from .autocomplete import autocomplete
+    autocomplete.init_app(app)
+    
+    from .search import search_cache
+    search_cache.init_app(app)
@@ -0,0 +1,194 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import urllib.request
+
+from flask import current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Third-party assets copied into static folder by build, with CDN location used until then.
+VENDOR = {
+    "vendor/bootstrap.min.css": "https://cdn.jsdelivr.net/npm/bootstrap@4.6.2/dist/css/bootstrap.min.css",
+    "vendor/jquery.slim.min.js": "https://cdn.jsdelivr.net/npm/jquery@3.5.1/dist/jquery.slim.min.js",
+    "vendor/bootstrap.bundle.min.js": "https://cdn.jsdelivr.net/npm/bootstrap@4.6.2/dist/js/bootstrap.bundle.min.js",
+    "vendor/socket.io.min.js": "https://cdnjs.cloudflare.com/ajax/libs/socket.io/4.5.0/socket.io.min.js",
+    "vendor/moment-with-locales.min.js": "https://cdnjs.cloudflare.com/ajax/libs/moment.js/2.29.1/moment-with-locales.min.js"
+}
+
+# Extensions of files worth storing precompressed.
+COMPRESSIBLE = (".css", ".js", ".json", ".map", ".svg", ".ico", ".txt")
+
+# Precompressed variants by preference: (content encoding, file suffix).
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+
+def fetch_vendor(static_folder):
+    """Download missing third-party assets into static folder. Return list of failed files.
+
+    :param static_folder: application static folder path.
+    """
+    failed = []
+    for filename, url in VENDOR.items():
+        path = os.path.join(static_folder, filename)
+        if os.path.exists(path):
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response, open(path + ".tmp", "wb") as f:
+                shutil.copyfileobj(response, f)
+        except OSError:
+            failed.append(filename)
+            continue
+        os.replace(path + ".tmp", path)
+    return failed
+
+
+def fingerprint(filename, content):
+    """Return filename with content hash inserted before extension, e.g. css/styles.3f2a9c1b7d4e.css."""
+    root, ext = os.path.splitext(filename)
+    return f"{root}.{hashlib.md5(content).hexdigest()[:12]}{ext}"
+
+
+def compress(path, content):
+    """Write gzip and (if brotli is installed) brotli variants of file if they are smaller.
+    Return list of written content encodings.
+
+    :param path: path of fingerprinted file.
+    :param content: file content.
+    """
+    variants = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(content)
+    written = []
+    for encoding, suffix in ENCODINGS:
+        if encoding in variants and len(variants[encoding]) < len(content):
+            with open(path + suffix, "wb") as f:
+                f.write(variants[encoding])
+            written.append(encoding)
+    return written
+
+
+class Assets:
+    """Serve fingerprinted and precompressed static files produced by build.
+
+    url_for("static", filename=...) resolves to fingerprinted name when file is
+    in build manifest. Such files never change, so they are served with
+    immutable far-future cache headers.
+    """
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Load build manifest, rewrite static urls and replace static files view."""
+        self.load(app)
+        app.url_defaults(self.hashed_filename)
+        app.view_functions["static"] = self.send_static
+        app.add_template_global(self.vendor)
+
+    @staticmethod
+    def build_dir(app):
+        return app.config.get("ASSETS_BUILD_DIR") or os.path.join(app.static_folder, "build")
+
+    def load(self, app):
+        """Read build manifest of application if it exists."""
+        path = self.build_dir(app)
+        try:
+            with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = {"files": {}, "encodings": {}}
+        app.extensions["assets"] = {
+            "path": path,
+            "files": manifest["files"],
+            "hashed": set(manifest["files"].values()),
+            "encodings": manifest["encodings"]
+        }
+
+    @property
+    def state(self):
+        return current_app.extensions["assets"]
+
+    def build(self, app, vendor=True):
+        """Copy static files to build directory under fingerprinted names, precompress them
+        and write manifest. Return (number of built files, list of vendor files which failed to download).
+
+        :param app: flask application object.
+        :param vendor: download third-party assets before build.
+        """
+        failed = fetch_vendor(app.static_folder) if vendor else []
+        path = self.build_dir(app)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        files, encodings = {}, {}
+        for root, dirs, filenames in os.walk(app.static_folder):
+            dirs[:] = [d for d in dirs if os.path.join(root, d) != path]
+            for name in filenames:
+                source = os.path.join(root, name)
+                filename = os.path.relpath(source, app.static_folder).replace(os.sep, "/")
+                if filename.endswith(".tmp"):
+                    continue
+                with open(source, "rb") as f:
+                    content = f.read()
+                hashed = fingerprint(filename, content)
+                target = os.path.join(path, hashed)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, "wb") as f:
+                    f.write(content)
+                files[filename] = hashed
+                if filename.endswith(COMPRESSIBLE):
+                    encodings[hashed] = compress(target, content)
+        with open(os.path.join(path, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({"files": files, "encodings": encodings}, f, indent=2, sort_keys=True)
+        self.load(app)
+        return len(files), failed
+
+    def clean(self, app):
+        """Remove build directory, so static files are served as is."""
+        shutil.rmtree(self.build_dir(app), ignore_errors=True)
+        self.load(app)
+
+    def hashed_filename(self, endpoint, values):
+        """url_defaults hook replacing static filename with fingerprinted one."""
+        if endpoint == "static":
+            hashed = self.state["files"].get(values.get("filename"))
+            if hashed is not None:
+                values["filename"] = hashed
+
+    def vendor(self, filename):
+        """Return url of built third-party asset or its CDN url if it was not built.
+
+        :param filename: key of VENDOR dict.
+        """
+        if filename in self.state["files"]:
+            return url_for("static", filename=filename)
+        return VENDOR[filename]
+
+    def send_static(self, filename):
+        """Static files view. Fingerprinted files are sent precompressed when client accepts it."""
+        state = self.state
+        if filename not in state["hashed"]:
+            return current_app.send_static_file(filename)
+        encodings = state["encodings"].get(filename, [])
+        encoding = next((e for e, _ in ENCODINGS if e in encodings and request.accept_encodings[e]), None)
+        suffix = dict(ENCODINGS)[encoding] if encoding else ""
+        response = send_from_directory(state["path"], filename + suffix,
+                                       mimetype=mimetypes.guess_type(filename)[0],
+                                       max_age=current_app.config.get("ASSETS_MAX_AGE", 365 * 24 * 60 * 60))
+        if encodings:
+            response.vary.add("Accept-Encoding")
+        if encoding:
+            response.content_encoding = encoding
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+assets = Assets()
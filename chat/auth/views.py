@@ -6,6 +6,7 @@ from . import auth
 from .forms import EmailChangeForm, LoginForm, PasswordChangeForm, RegisterForm, \
     PasswordResetForm, PasswordResetRequestForm
 from ..models import db, User
+from ..profiles import profiles
 from ..utils import send_mail
 
 
@@ -166,6 +167,7 @@ def confirm_change_email(token):
     """
     if current_user.verify_email_token(token):
         db.session.commit()
+        profiles.refresh(current_user)
         flash(gettext("Your email successfully has been changed."), "success")
         return redirect(url_for('main.index'))
     flash(gettext("Invalid email change token."), "error")
@@ -0,0 +1,154 @@
+import re
+import time
+from bisect import bisect_left, insort
+from threading import Lock
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from .models import Room
+
+word = re.compile(r"\w+")
+
+
+def words(text):
+    """Return lowercase words of the text."""
+    return word.findall((text or "").lower())
+
+
+class RoomNameIndex:
+    """Sorted array of (word, room name, room id) entries for every word of every room name.
+
+    Rooms with a word starting with typed prefix are found with bisect, so
+    lookup is O(log n + k) and never touches database. Index is loaded on
+    first use and then kept up to date by add and remove calls, rooms
+    created or deleted through ORM are applied after commit. Index is
+    reloaded after AUTOCOMPLETE_TTL seconds, so rooms created by other
+    processes (other workers, import command) are picked up too.
+    """
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register empty index in application."""
+        app.extensions["autocomplete"] = {
+            "entries": None,
+            "rooms": {},
+            "ttl": app.config.get("AUTOCOMPLETE_TTL", 60),
+            "loaded_at": None,
+            "lock": Lock()
+        }
+
+    @property
+    def state(self):
+        return current_app.extensions["autocomplete"]
+
+    @staticmethod
+    def _entries(room_id, name):
+        return [(key, name, room_id) for key in set(words(name))]
+
+    def _load(self, state):
+        rooms = {room_id: self._entries(room_id, name)
+                 for room_id, name in Room.query.with_entities(Room.room_id, Room.name)}
+        state["rooms"] = rooms
+        state["entries"] = sorted(entry for entries in rooms.values() for entry in entries)
+        state["loaded_at"] = time.monotonic()
+
+    def entries(self):
+        """Return index entries, loading them from database on first use and after TTL."""
+        state = self.state
+        loaded_at = state["loaded_at"]
+        if loaded_at is None or time.monotonic() - loaded_at > state["ttl"]:
+            with state["lock"]:
+                if state["loaded_at"] is loaded_at:
+                    self._load(state)
+        return state["entries"]
+
+    def add(self, room_id, name):
+        """Add new room to index.
+
+        :param room_id: unique room identifier.
+        :param name: room name.
+        """
+        state = self.state
+        with state["lock"]:
+            if state["entries"] is None or room_id in state["rooms"]:
+                return
+            state["rooms"][room_id] = self._entries(room_id, name)
+            for entry in state["rooms"][room_id]:
+                insort(state["entries"], entry)
+
+    def remove(self, room_id):
+        """Remove deleted room from index.
+
+        :param room_id: unique room identifier.
+        """
+        state = self.state
+        with state["lock"]:
+            if state["entries"] is None:
+                return
+            for entry in state["rooms"].pop(room_id, []):
+                i = bisect_left(state["entries"], entry)
+                if i < len(state["entries"]) and state["entries"][i] == entry:
+                    del state["entries"][i]
+
+    def complete(self, q, limit=10):
+        """Return up to limit (room_id, name) pairs of rooms matching typed query.
+        Last word of query is treated as prefix, other words must match room words exactly.
+
+        :param q: typed query.
+        :param limit: maximum number of rooms.
+        """
+        *typed, prefix = words(q) or [""]
+        if not prefix:
+            return []
+        entries = self.entries()
+        found, seen = [], set()
+        for i in range(bisect_left(entries, (prefix,)), len(entries)):
+            key, name, room_id = entries[i]
+            if not key.startswith(prefix) or len(found) >= limit:
+                break
+            if room_id not in seen and set(typed) <= set(words(name)):
+                seen.add(room_id)
+                found.append((room_id, name))
+        return found
+
+
+autocomplete = RoomNameIndex()
+
+
+def remember_change(target, deleted):
+    changes = object_session(target).info.setdefault("autocomplete_changes", [])
+    changes.append((target.room_id, target.name, deleted))
+
+
+@event.listens_for(Room, "after_insert")
+def room_inserted(mapper, connection, target):
+    """Remember room created through ORM until session is committed."""
+    remember_change(target, deleted=False)
+
+
+@event.listens_for(Room, "after_delete")
+def room_deleted(mapper, connection, target):
+    """Remember room deleted through ORM until session is committed."""
+    remember_change(target, deleted=True)
+
+
+@event.listens_for(Session, "after_commit")
+def apply_room_changes(session):
+    """Apply committed room changes to the index."""
+    changes = session.info.pop("autocomplete_changes", [])
+    if changes and has_app_context() and "autocomplete" in current_app.extensions:
+        for room_id, name, deleted in changes:
+            if deleted:
+                autocomplete.remove(room_id)
+            else:
+                autocomplete.add(room_id, name)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_room_changes(session):
+    """Forget room changes which were rolled back."""
+    session.info.pop("autocomplete_changes", None)
@@ -0,0 +1,58 @@
+from collections import OrderedDict
+from threading import Lock
+
+
+class LRUCache:
+    """Thread-safe size bounded cache with least recently used eviction.
+
+    :param maxsize: maximum number of entries kept in cache.
+    """
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        """Return cached value and mark it as recently used.
+
+        :param key: cache key.
+        :param default: value returned if key is missing.
+        """
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key, value):
+        """Store value in cache, evicting least recently used entry if full.
+
+        :param key: cache key.
+        :param value: value to store.
+        """
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove entry from cache if present.
+
+        :param key: cache key.
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove all entries from cache."""
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
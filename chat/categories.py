@@ -0,0 +1,125 @@
+import time
+from collections import namedtuple
+from threading import Lock
+
+from flask import abort, current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from .models import db, Category, Room
+
+# Immutable category record shared between requests.
+CategoryEntry = namedtuple("CategoryEntry", ["category_id", "name"])
+
+# Loaded registry: categories by id, categories ordered by name, rooms per category id and total rooms.
+Snapshot = namedtuple("Snapshot", ["by_id", "ordered", "counts", "total", "loaded_at"])
+
+
+class CategoryRegistry:
+    """In-memory registry of categories with number of rooms in each of them.
+
+    Registry is loaded once and reloaded after category or room is added or
+    removed in this process, or after CATEGORY_CACHE_TTL seconds, so changes
+    made by other processes (e.g. insert_categories command) are picked up too.
+    """
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register empty registry in application."""
+        app.extensions["categories"] = {
+            "snapshot": None,
+            "ttl": app.config.get("CATEGORY_CACHE_TTL", 60),
+            "lock": Lock()
+        }
+
+    @property
+    def state(self):
+        return current_app.extensions["categories"]
+
+    @staticmethod
+    def load():
+        """Read categories and room counts from database."""
+        entries = [CategoryEntry(category.category_id, category.name)
+                   for category in Category.query.order_by(Category.name).all()]
+        counts = dict(db.session.query(Room.category_id, db.func.count(Room.room_id)).group_by(Room.category_id).all())
+        return Snapshot(by_id={entry.category_id: entry for entry in entries}, ordered=entries, counts=counts,
+                        total=sum(counts.values()), loaded_at=time.monotonic())
+
+    @property
+    def snapshot(self):
+        state = self.state
+        snapshot = state["snapshot"]
+        if snapshot is None or time.monotonic() - snapshot.loaded_at > state["ttl"]:
+            with state["lock"]:
+                if state["snapshot"] is snapshot:
+                    state["snapshot"] = self.load()
+                snapshot = state["snapshot"]
+        return snapshot
+
+    def invalidate(self):
+        """Drop loaded registry, so it is reloaded on next access."""
+        if has_app_context() and "categories" in current_app.extensions:
+            self.state["snapshot"] = None
+
+    def get(self, category_id):
+        """Return category entry by identifier or None.
+
+        :param category_id: category identifier, int or numeric string.
+        """
+        try:
+            return self.snapshot.by_id.get(int(category_id))
+        except (TypeError, ValueError):
+            return None
+
+    def get_or_404(self, category_id):
+        """Return category entry by identifier or abort with 404 error.
+
+        :param category_id: category identifier, int or numeric string.
+        """
+        entry = self.get(category_id)
+        if entry is None:
+            abort(404)
+        return entry
+
+    def choices(self):
+        """Return (category_id, name) pairs ordered by name for select fields."""
+        return [(entry.category_id, entry.name) for entry in self.snapshot.ordered]
+
+    def count(self, category_id=None):
+        """Return number of rooms in category, or total number of rooms if category is not given.
+
+        :param category_id: category identifier.
+        """
+        snapshot = self.snapshot
+        return snapshot.total if category_id is None else snapshot.counts.get(category_id, 0)
+
+    def top(self, limit):
+        """Return (category entry, rooms count) pairs for categories with most rooms.
+
+        :param limit: maximum number of categories.
+        """
+        snapshot = self.snapshot
+        ranked = sorted(snapshot.ordered, key=lambda entry: -snapshot.counts.get(entry.category_id, 0))
+        return [(entry, snapshot.counts.get(entry.category_id, 0)) for entry in ranked[:limit]]
+
+
+categories = CategoryRegistry()
+
+
+@event.listens_for(Category, "after_insert")
+@event.listens_for(Category, "after_update")
+@event.listens_for(Category, "after_delete")
+@event.listens_for(Room, "after_insert")
+@event.listens_for(Room, "after_delete")
+def categories_changed(mapper, connection, target):
+    """Mark session which changed categories or room counts through ORM."""
+    object_session(target).info["categories_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_categories(session):
+    """Reload registry after changes to categories or room counts were committed."""
+    if session.info.pop("categories_changed", False):
+        categories.invalidate()
@@ -0,0 +1,80 @@
+import gzip
+import zlib
+
+from flask import current_app, request
+
+# Content types compressed by default. Images and fonts are already compressed.
+MIMETYPES = ["text/html", "text/css", "text/plain", "text/xml", "text/javascript",
+             "application/json", "application/javascript", "application/xml", "image/svg+xml"]
+
+
+def gzip_stream(chunks, level, charset="utf-8"):
+    """Compress response chunks one by one, flushing compressor after every chunk
+    so browser can render streamed page progressively.
+
+    :param chunks: iterable of response body chunks.
+    :param level: gzip compression level.
+    :param charset: charset used to encode str chunks.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode(charset)
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+class Compress:
+    """Gzip compression of dynamic responses.
+
+    Only responses of configured content types, larger than COMPRESS_MIN_SIZE
+    are compressed. Streamed responses are compressed chunk by chunk. Files
+    sent directly (static files) are left as is, they are precompressed by
+    assets build.
+    """
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register compression hook. Should be called before other after_request hooks
+        are registered, so it is run last and compresses final response body.
+        """
+        app.extensions["compress"] = {
+            "level": app.config.get("COMPRESS_LEVEL", 6),
+            "min_size": app.config.get("COMPRESS_MIN_SIZE", 500),
+            "mimetypes": set(app.config.get("COMPRESS_MIMETYPES", MIMETYPES))
+        }
+        app.after_request(self.compress)
+
+    def compress(self, response):
+        """Compress response body if client accepts gzip and response is worth it."""
+        options = current_app.extensions["compress"]
+        if (not options["level"] or response.direct_passthrough or response.status_code < 200 or response.status_code in (204, 304)
+                or "Content-Encoding" in response.headers or response.mimetype not in options["mimetypes"]
+                or request.method == "HEAD"):
+            return response
+        response.vary.add("Accept-Encoding")
+        if not request.accept_encodings["gzip"]:
+            return response
+        if response.is_streamed:
+            response.response = gzip_stream(response.response, options["level"], response.charset)
+            response.headers.pop("Content-Length", None)
+        else:
+            if response.content_length is not None and response.content_length < options["min_size"]:
+                return response
+            response.set_data(gzip.compress(response.get_data(), options["level"]))
+        response.content_encoding = "gzip"
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+compress = Compress()
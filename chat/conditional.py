@@ -0,0 +1,77 @@
+import hashlib
+
+from flask import g, make_response, request, session
+from flask_babel import get_locale
+from flask_login import current_user
+
+from .categories import categories
+from .models import db, Category, Room
+
+
+def site_version():
+    """Return version stamp of data shown on every page (sidebar and room listings).
+    Rooms count comes from category registry, latest change times use index on
+    rooms.updated_at and small categories table, so no statement scans rooms.
+    """
+    categories_updated_at = db.session.query(db.func.max(Category.updated_at)).scalar_subquery()
+    rooms_updated_at, categories_updated_at = db.session.query(db.func.max(Room.updated_at),
+                                                               categories_updated_at).one()
+    return categories.count(), rooms_updated_at, categories_updated_at
+
+
+def newest(*dates):
+    """Return latest of given dates ignoring None values, None if no dates given."""
+    return max(filter(None, dates), default=None)
+
+
+class ConditionalRequests:
+    """Answer conditional GET requests with 304 before page is rendered.
+
+    View computes cheap version stamp of the resource and calls not_modified
+    before heavy queries. ETag also covers current user and locale, so
+    personalized pages are never shared between users.
+    """
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register hook adding validators to rendered responses."""
+        app.after_request(self.add_validators)
+
+    def not_modified(self, *parts, last_modified=None):
+        """Return 304 response if client copy of the page is fresh, None otherwise.
+
+        :param parts: values page content depends on.
+        :param last_modified: date and time page content was changed.
+        """
+        if request.method != "GET" or session.get("_flashes"):
+            return None
+        user = (current_user.user_id, current_user.gravatar_hash) if current_user.is_authenticated else None
+        etag = hashlib.md5(repr((parts, user, str(get_locale()))).encode("utf-8")).hexdigest()
+        last_modified = last_modified.replace(microsecond=0) if last_modified else None
+        g.validators = (etag, last_modified)
+        if request.if_none_match:
+            fresh = request.if_none_match.contains_weak(etag)
+        else:
+            fresh = bool(last_modified and request.if_modified_since and
+                         last_modified <= request.if_modified_since.replace(tzinfo=None))
+        if not fresh:
+            return None
+        return self.add_validators(make_response("", 304))
+
+    def add_validators(self, response):
+        """Set ETag and Last-Modified on response of view which called not_modified."""
+        validators = g.pop("validators", None)
+        if validators is None or response.status_code not in (200, 304):
+            return response
+        etag, last_modified = validators
+        response.set_etag(etag)
+        if last_modified is not None:
+            response.last_modified = last_modified
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
+
+conditional = ConditionalRequests()
@@ -0,0 +1,119 @@
+from datetime import datetime
+
+from sqlalchemy import inspect
+
+from .autocomplete import autocomplete
+from .categories import categories
+from .fragments import fragments, ROOM_FRAGMENTS
+from .models import db, participants, Message, MessageArchive, MessageTerm, Room, User
+from .profiles import profiles
+from .search import search_cache
+from .trending import trending
+
+
+# Tables whose rows are removed by ON DELETE CASCADE when room or user is deleted.
+DEPENDENT_TABLES = ["participants", "messages", "message_archives", "message_terms", "rooms"]
+
+
+def cascade_supported():
+    """Check if database enforces foreign keys and schema declares ON DELETE CASCADE
+    on every foreign key to rooms, users and messages. Databases created before
+    cascades were added to migrations enforce keys without cascading.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == "sqlite":
+        if not db.session.execute(db.text("PRAGMA foreign_keys")).scalar():
+            return False
+    elif dialect != "postgresql":
+        return False
+    inspector = inspect(db.engine)
+    for table in DEPENDENT_TABLES:
+        for key in inspector.get_foreign_keys(table):
+            if key["referred_table"] in ("rooms", "users", "messages") and \
+                    (key.get("options") or {}).get("ondelete", "").upper() != "CASCADE":
+                return False
+    return True
+
+
+def delete_chunked(table, pk, condition, chunk_size):
+    """Delete rows matching condition in chunks, committing after each chunk.
+    Return number of deleted rows.
+
+    :param table: sqlalchemy table object.
+    :param pk: primary key column used to select chunk.
+    :param condition: sqlalchemy filter expression.
+    :param chunk_size: maximum number of rows deleted by one statement.
+    """
+    deleted = 0
+    while True:
+        chunk = db.select(pk).where(condition).limit(chunk_size).scalar_subquery()
+        result = db.session.execute(table.delete().where(pk.in_(chunk)))
+        db.session.commit()
+        deleted += result.rowcount
+        if result.rowcount < chunk_size:
+            return deleted
+
+
+def delete_rows(table, pk, condition, chunk_size=None):
+    """Delete rows matching condition with one statement or in chunks.
+
+    :param table: sqlalchemy table object.
+    :param pk: primary key column used to select chunk.
+    :param condition: sqlalchemy filter expression.
+    :param chunk_size: maximum number of rows deleted by one statement, None for no limit.
+    """
+    if chunk_size:
+        return delete_chunked(table, pk, condition, chunk_size)
+    return db.session.execute(table.delete().where(condition)).rowcount
+
+
+def delete_room(room_id, chunk_size=None):
+    """Delete room with messages, archives and participants using set-based DELETE statements.
+    Dependent rows are left to ON DELETE CASCADE when database enforces it and no chunking is asked.
+
+    :param room_id: unique room identifier.
+    :param chunk_size: maximum number of rows deleted by one statement, None for no limit.
+    """
+    if chunk_size or not cascade_supported():
+        messages, archives, terms = Message.__table__, MessageArchive.__table__, MessageTerm.__table__
+        delete_rows(terms, terms.c.message_id, terms.c.room_id == room_id, chunk_size)
+        delete_rows(messages, messages.c.message_id, messages.c.room_id == room_id, chunk_size)
+        delete_rows(archives, archives.c.archive_id, archives.c.room_id == room_id, chunk_size)
+        db.session.execute(participants.delete().where(participants.c.room_id == room_id))
+    db.session.execute(Room.__table__.delete().where(Room.__table__.c.room_id == room_id))
+    db.session.commit()
+    categories.invalidate()
+    autocomplete.remove(room_id)
+    search_cache.invalidate()
+    trending.forget(room_id)
+    for name in ROOM_FRAGMENTS:
+        fragments.invalidate(name, room_id)
+
+
+def delete_user(user_id, chunk_size=None):
+    """Delete user with owned rooms, messages and memberships using set-based DELETE statements.
+
+    :param user_id: unique user identifier.
+    :param chunk_size: maximum number of rows deleted by one statement, None for no limit.
+    """
+    rooms = db.session.execute(db.select(Room.room_id).where(Room.creator_id == user_id)).scalars().all()
+    joined = db.session.execute(db.select(participants.c.room_id).where(participants.c.user_id == user_id)).scalars().all()
+    for room_id in rooms:
+        delete_room(room_id, chunk_size)
+    if chunk_size or not cascade_supported():
+        messages, terms = Message.__table__, MessageTerm.__table__
+        sent = db.select(messages.c.message_id).where(messages.c.sender_id == user_id)
+        delete_rows(terms, terms.c.message_id, terms.c.message_id.in_(sent), chunk_size)
+        delete_rows(messages, messages.c.message_id, messages.c.sender_id == user_id, chunk_size)
+        db.session.execute(participants.delete().where(participants.c.user_id == user_id))
+    db.session.execute(User.__table__.delete().where(User.__table__.c.user_id == user_id))
+    # Rooms the user participated in lost a participant.
+    changed = [room_id for room_id in joined if room_id not in rooms]
+    if changed:
+        db.session.execute(Room.__table__.update().where(Room.__table__.c.room_id.in_(changed))
+                           .values(updated_at=datetime.utcnow()))
+    db.session.commit()
+    profiles.invalidate(user_id)
+    for room_id in changed:
+        for name in ROOM_FRAGMENTS:
+            fragments.invalidate(name, room_id)
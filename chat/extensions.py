@@ -1,17 +1,17 @@
-from flask import current_app, request
-from flask_sqlalchemy import SQLAlchemy
+from flask import request
 from flask_babel import Babel, lazy_gettext as _l
 from flask_login import LoginManager
 from flask_mail import Mail
-from flask_migrate import Migrate
 from flask_moment import Moment
 from flask_socketio import SocketIO
 
+from .i18n import translations
+from .routing import RoutingSQLAlchemy
+
 babel = Babel()
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
 login_manager = LoginManager()
 mail = Mail()
-migrate = Migrate(compare_type=True)
 moment = Moment()
 sio = SocketIO()
 
@@ -25,4 +25,13 @@ login_manager.session_protection = "strong"
 @babel.localeselector
 def get_locale():
     lang = request.cookies.get("lang")
-    return lang or request.accept_languages.best_match(current_app.config["LANGUAGES_LIST"].keys())
+    return lang or translations.best_match()
+
+
+def __getattr__(name):
+    # Flask-Migrate imports alembic, so it is created only when "flask db" commands need it.
+    if name == "migrate":
+        from flask_migrate import Migrate
+        globals()["migrate"] = Migrate(compare_type=True)
+        return globals()["migrate"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from flask import current_app, g
+from flask_babel import get_locale
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from .cache import LRUCache
+
+
+class MemoryBackend:
+    """In-process LRU storage of fragments.
+
+    :param app: flask application object.
+    """
+    def __init__(self, app):
+        self.cache = LRUCache(app.config.get("FRAGMENT_CACHE_SIZE", 1024))
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, variants):
+        self.cache.set(key, variants)
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+
+class FileSystemBackend:
+    """Fragment storage in local directory shared by all workers on the host.
+
+    :param app: flask application object.
+    """
+    def __init__(self, app):
+        self.path = app.config.get("FRAGMENT_CACHE_DIR") or \
+            os.path.join(tempfile.gettempdir(), "intouch-fragments")
+        os.makedirs(self.path, exist_ok=True)
+
+    def _filename(self, key):
+        return os.path.join(self.path, hashlib.md5(key.encode("utf-8")).hexdigest())
+
+    def get(self, key):
+        try:
+            with open(self._filename(key), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def set(self, key, variants):
+        filename = self._filename(key)
+        fd, tmp = tempfile.mkstemp(dir=self.path)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(variants, f)
+        os.replace(tmp, filename)
+
+    def delete(self, key):
+        try:
+            os.remove(self._filename(key))
+        except FileNotFoundError:
+            pass
+
+
+# Fragments rendered for every room in room listings.
+ROOM_FRAGMENTS = ["room", "room_no_category"]
+
+# Fragment cache storage backends by config name.
+backends = {
+    "memory": MemoryBackend,
+    "filesystem": FileSystemBackend
+}
+
+
+class FragmentCacheExtension(Extension):
+    """Jinja extension adding cache tag.
+
+    Usage: {% cache "room", room.room_id %}...{% endcache %}. Any extra
+    arguments after object identifier are treated as variant of the fragment.
+    """
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(["name:endcache"], drop_needle=True)
+        call = self.call_method("_render", [nodes.List(args)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, args, caller):
+        name, object_id, *vary = args
+        return fragments.render(name, object_id, vary, caller)
+
+
+class FragmentCache:
+    """Cache of rendered template fragments.
+
+    All variants of one object fragment (locales and extra vary arguments)
+    are stored under single key, so invalidation is one delete.
+    """
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Create cache backend and register cache tag in application."""
+        backend = app.config.get("FRAGMENT_CACHE_BACKEND", "memory")
+        app.extensions["fragments"] = backends[backend](app) if backend else None
+        app.jinja_env.add_extension(FragmentCacheExtension)
+
+    @property
+    def backend(self):
+        return current_app.extensions["fragments"]
+
+    def render(self, name, object_id, vary, caller):
+        """Return cached fragment or render and cache it.
+
+        :param name: fragment name.
+        :param object_id: identifier of object fragment is rendered for.
+        :param vary: list of extra values fragment depends on.
+        :param caller: function rendering fragment body.
+        """
+        backend = self.backend
+        if backend is None:
+            return caller()
+        key = f"{name}:{object_id}"
+        variant = ":".join(str(value) for value in [g.get("locale") or get_locale(), *vary])
+        variants = backend.get(key) or {}
+        if variant not in variants:
+            variants[variant] = str(caller())
+            backend.set(key, variants)
+        return Markup(variants[variant])
+
+    def invalidate(self, name, object_id):
+        """Remove every variant of object fragment.
+
+        :param name: fragment name.
+        :param object_id: identifier of object fragment is rendered for.
+        """
+        if self.backend is not None:
+            self.backend.delete(f"{name}:{object_id}")
+
+
+fragments = FragmentCache()
@@ -0,0 +1,89 @@
+import os
+
+from babel import Locale, support
+from flask import current_app, request
+
+from .cache import LRUCache
+
+
+def compile_catalogs(directory, domain="messages", force=False, use_fuzzy=False):
+    """Compile .po catalogs of every language in directory into .mo files in-process.
+    Catalogs whose .mo file is newer than .po file are skipped unless force is set.
+    Return list of compiled locales.
+
+    :param directory: translations directory.
+    :param domain: message domain.
+    :param force: compile up-to-date catalogs too.
+    :param use_fuzzy: compile catalogs marked as fuzzy and include fuzzy translations.
+    """
+    from babel.messages.mofile import write_mo
+    from babel.messages.pofile import read_po
+    compiled = []
+    for locale in sorted(os.listdir(directory)):
+        po_path = os.path.join(directory, locale, "LC_MESSAGES", f"{domain}.po")
+        mo_path = os.path.join(directory, locale, "LC_MESSAGES", f"{domain}.mo")
+        if not os.path.exists(po_path):
+            continue
+        if not force and os.path.exists(mo_path) and os.path.getmtime(mo_path) >= os.path.getmtime(po_path):
+            continue
+        with open(po_path, "rb") as f:
+            catalog = read_po(f, locale)
+        if catalog.fuzzy and not use_fuzzy:
+            continue
+        with open(mo_path, "wb") as f:
+            write_mo(f, catalog, use_fuzzy=use_fuzzy)
+        compiled.append(locale)
+    return compiled
+
+
+class Translations:
+    """Translation catalogs of LANGUAGES_LIST loaded at startup and memoized
+    resolution of Accept-Language header to one of them.
+
+    Catalogs are put into Flask-Babel domain cache, so first request in each
+    language does not read .mo files. Accept-Language header values are few
+    in practice, resolved locale is kept in LRU cache by raw header.
+    """
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Create locale cache and preload catalogs. Must be called after Babel is initialized."""
+        app.extensions["locales"] = LRUCache(app.config.get("LOCALE_CACHE_SIZE", 256))
+        self.preload(app)
+
+    @staticmethod
+    def preload(app):
+        """Load catalogs of all application languages into Flask-Babel domain cache.
+
+        :param app: flask application object.
+        """
+        babel = app.extensions["babel"]
+        with app.app_context():
+            domain = babel.domain_instance
+            directories = list(domain.translation_directories)
+            for lang in app.config.get("LANGUAGES_LIST", {}):
+                locale = Locale.parse(lang)
+                if (str(locale), domain.domain) in domain.cache:
+                    continue
+                translations = support.Translations()
+                for dirname in directories:
+                    catalog = support.Translations.load(dirname, [locale], domain.domain)
+                    translations.merge(catalog)
+                    if hasattr(catalog, "plural"):
+                        translations.plural = catalog.plural
+                domain.cache[str(locale), domain.domain] = translations
+
+    def best_match(self):
+        """Return application language best matching Accept-Language header of current request."""
+        cache = current_app.extensions["locales"]
+        header = request.headers.get("Accept-Language", "")
+        lang = cache.get(header)
+        if lang is None:
+            lang = request.accept_languages.best_match(current_app.config["LANGUAGES_LIST"].keys()) or ""
+            cache.set(header, lang)
+        return lang or None
+
+
+translations = Translations()
@@ -1,7 +1,11 @@
-from flask import current_app, redirect, request, render_template, url_for, make_response
+from flask import abort, current_app, jsonify, redirect, request, render_template, url_for, make_response
 
 from . import main
+from ..autocomplete import autocomplete
+from ..conditional import conditional, newest, site_version
 from ..models import Room
+from ..search import search_cache
+from ..trending import trending
 
 
 @main.route("/")
@@ -11,6 +15,10 @@ def index():
     :GET - return html page with recently created rooms.
     """
     page = request.args.get("page", 1, type=int)
+    version = site_version()
+    response = conditional.not_modified(page, *version, last_modified=newest(*version[1:]))
+    if response is not None:
+        return response
     pagination = Room.query.order_by(Room.created_at.desc()).paginate(
         page=page, per_page=current_app.config["ROOMS_PER_PAGE"]
     )
@@ -18,6 +26,18 @@ def index():
     return render_template("index.html", rooms=rooms, pagination=pagination)
 
 
+@main.route("/trending")
+def trending_rooms():
+    """Trending rooms Page route handler.
+    
+    :GET - return html page with rooms which got most messages recently.
+    """
+    top = trending.top()
+    rooms = {room.room_id: room for room in Room.query.filter(Room.room_id.in_([room_id for room_id, _ in top]))}
+    rooms = [rooms[room_id] for room_id, _ in top if room_id in rooms]
+    return render_template("rooms/trending.html", rooms=rooms)
+
+
 @main.route("/search")
 def search():
     """Search Page route handler.
@@ -29,15 +49,27 @@ def search():
         return redirect(url_for("main.index"))
     
     page = request.args.get("page", 1, type=int)
-    query = Room.search(q)
-    
-    pagination = query.paginate(
-        page=page, per_page=current_app.config["ROOMS_PER_PAGE"]
-    )
+    if page < 1:
+        abort(404)
+    pagination = search_cache.paginate(q, page, current_app.config["ROOMS_PER_PAGE"])
+    if not pagination.items and page != 1:
+        abort(404)
     rooms = pagination.items
     return render_template("rooms/search.html", pagination=pagination, rooms=rooms, q=q)
 
 
+@main.route("/search/autocomplete")
+def search_autocomplete():
+    """Search autocomplete route handler.
+    
+    :GET - return json list of rooms with name words starting with typed query.
+    """
+    q = request.args.get("q", "")
+    rooms = autocomplete.complete(q, limit=current_app.config.get("AUTOCOMPLETE_LIMIT", 10))
+    return jsonify(rooms=[{"room_id": room_id, "name": name, "url": url_for("rooms.room", room_id=room_id)}
+                          for room_id, name in rooms])
+
+
 @main.route("/language")
 def set_language():
     """Set language Page route handler.
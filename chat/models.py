@@ -1,4 +1,8 @@
 import hashlib
+import json
+import re
+import zlib
+from collections import Counter
 from datetime import datetime, timedelta, timezone
 
 import jwt
@@ -11,8 +15,8 @@ from .extensions import db, login_manager
 
 # SQLAlchemy table to represent many-to-many relationship between "rooms" and "users" tables.
 participants = db.Table("participants",
-    db.Column("room_id", db.Integer, db.ForeignKey("rooms.room_id"), primary_key=True),
-    db.Column("user_id", db.Integer, db.ForeignKey("users.user_id"), primary_key=True)
+    db.Column("room_id", db.Integer, db.ForeignKey("rooms.room_id", ondelete="CASCADE"), primary_key=True),
+    db.Column("user_id", db.Integer, db.ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True)
 )
 
 
@@ -37,12 +41,14 @@ class Category(db.Model):
     
     :param category_id: unique primary key.
     :param name: category name.
+    :param updated_at: date and time when category or list of its rooms was changed.
     :param rooms: sqlalchemy orm relationship with "rooms" table.
     """
     __tablename__ = "categories"
     
     category_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(64), index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     rooms = db.relationship("Room", backref="category", cascade="all,delete", lazy="dynamic")
     
@@ -57,9 +63,11 @@ class Room(Searchable, db.Model):
     :param name: rooms name.
     :param description: room description.
     :param created_at: date and time when room was created.
+    :param updated_at: date and time when room or its participants were changed.
     :param creator_id: [foreign key] room creator identifier.
     :param category_id: [foreign key] category identifier.
     :param messages: sqlalchemy orm relationship with "messages" table.
+    :param archives: sqlalchemy orm relationship with "message_archives" table.
     :param messages: sqlalchemy orm relationship with "users" table.
     """
     __tablename__ = "rooms"
@@ -69,20 +77,43 @@ class Room(Searchable, db.Model):
     name = db.Column(db.String(128), index=True)
     description = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    creator_id = db.Column(db.Integer, db.ForeignKey("users.user_id"))
-    category_id = db.Column(db.Integer, db.ForeignKey("categories.category_id"))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    creator_id = db.Column(db.Integer, db.ForeignKey("users.user_id", ondelete="CASCADE"))
+    category_id = db.Column(db.Integer, db.ForeignKey("categories.category_id", ondelete="CASCADE"))
     
     messages = db.relationship("Message", backref="room", cascade="all,delete", lazy="dynamic")
+    archives = db.relationship("MessageArchive", backref="room", cascade="all,delete", lazy="dynamic")
     users = db.relationship("User", secondary=participants, lazy="dynamic", backref=db.backref("rooms", lazy="dynamic"))
     
     def clean(self):
-        """Delete messages if there are more than available."""
-        messages_count = self.messages.count()
-        if messages_count > current_app.config["MAX_MESSAGES_AVAILABLE"]:
-            distance = messages_count - current_app.config["MAX_MESSAGES_AVAILABLE"]
-            messages = self.messages.order_by(Message.sent_at).limit(distance).all()
-            for message in messages:
-                db.session.delete(message)
+        """Move messages to archive if there are more than available.
+        Messages are archived in batches of at least ARCHIVE_BATCH_SIZE to keep segments compact.
+        """
+        distance = self.messages.count() - int(current_app.config["MAX_MESSAGES_AVAILABLE"])
+        if distance > 0 and distance >= current_app.config["ARCHIVE_BATCH_SIZE"]:
+            rows = db.session.query(Message.message_id, Message.text, Message.sent_at, Message.sender_id) \
+                .filter(Message.room_id == self.room_id) \
+                .order_by(Message.sent_at, Message.message_id).limit(distance).all()
+            MessageArchive.archive(self.room_id, rows)
+    
+    def touch(self):
+        """Mark room as changed, e.g. after participants list was changed."""
+        self.updated_at = datetime.utcnow()
+        db.session.add(self)
+    
+    @staticmethod
+    def is_participant(room_id, user):
+        """Check if user is room participant.
+        Use EXISTS query over "participants" primary key instead of loading room users.
+        
+        :param room_id: unique room identifier.
+        :param user: user object, anonymous user is never participant.
+        """
+        if not user.is_authenticated:
+            return False
+        query = participants.select().where(participants.c.room_id == room_id, 
+                                            participants.c.user_id == user.user_id)
+        return db.session.query(query.exists()).scalar()
 
     def __repr__(self):
         return f"<Room {self.name}>"
@@ -98,12 +129,210 @@ class Message(db.Model):
     :param room_id: [foreign key] room message was send identifier.
     """
     __tablename__ = "messages"
+    __table_args__ = (
+        db.Index("ix_messages_room_id_sent_at", "room_id", "sent_at", "message_id"),
+    )
     
     message_id = db.Column(db.Integer, primary_key=True)
     text = db.Column(db.String(200))
     sent_at = db.Column(db.DateTime, default=datetime.utcnow)
-    sender_id = db.Column(db.Integer, db.ForeignKey("users.user_id"))
-    room_id = db.Column(db.Integer, db.ForeignKey("rooms.room_id"))
+    sender_id = db.Column(db.Integer, db.ForeignKey("users.user_id", ondelete="CASCADE"))
+    room_id = db.Column(db.Integer, db.ForeignKey("rooms.room_id", ondelete="CASCADE"))
+    
+    @property
+    def cursor(self):
+        """Keyset pagination cursor of the message. None if message isn't stored yet."""
+        if self.message_id is None:
+            return None
+        return f"{self.sent_at.isoformat()}_{self.message_id}"
+    
+    @staticmethod
+    def parse_cursor(cursor):
+        """Parse keyset pagination cursor. Return (sent_at, message_id) or None if cursor is invalid.
+        
+        :param cursor: cursor string produced by Message.cursor.
+        """
+        sent_at, _, message_id = cursor.rpartition("_")
+        try:
+            return datetime.fromisoformat(sent_at), int(message_id)
+        except ValueError:
+            return None
+    
+    
+class MessageTerm(db.Model):
+    """SQLAlchemy model to represent "message_terms" table.
+    Inverted index of message text: one row per distinct word of every message
+    kept in "messages" table. Rows are added when message is stored and
+    removed together with message.
+    
+    :param term: normalized word.
+    :param room_id: [foreign key] room message was send identifier.
+    :param message_id: [foreign key] message identifier.
+    :param weight: number of word occurrences in message.
+    """
+    __tablename__ = "message_terms"
+    
+    term = db.Column(db.String(64), primary_key=True)
+    room_id = db.Column(db.Integer, db.ForeignKey("rooms.room_id", ondelete="CASCADE"), primary_key=True)
+    message_id = db.Column(db.Integer, db.ForeignKey("messages.message_id", ondelete="CASCADE"), 
+                           primary_key=True, index=True)
+    weight = db.Column(db.Integer, default=1)
+    
+    word = re.compile(r"\w{2,}")
+    
+    @classmethod
+    def tokenize(cls, text):
+        """Return Counter of normalized words of the text.
+        
+        :param text: message text or search query.
+        """
+        return Counter(word[:64] for word in cls.word.findall((text or "").lower()))
+    
+    @classmethod
+    def index(cls, messages):
+        """Add index rows for stored messages.
+        
+        :param messages: list of flushed message objects.
+        """
+        rows = [{"term": term, "room_id": message.room_id, "message_id": message.message_id, "weight": weight}
+                for message in messages for term, weight in cls.tokenize(message.text).items()]
+        if rows:
+            db.session.execute(cls.__table__.insert(), rows)
+    
+    @classmethod
+    def rebuild(cls, batch_size=1000):
+        """Recreate index of all stored messages, committing after every batch. Return number of indexed messages.
+        
+        :param batch_size: number of messages indexed at once.
+        """
+        db.session.execute(cls.__table__.delete())
+        db.session.commit()
+        count, last_id = 0, 0
+        while True:
+            messages = Message.query.filter(Message.message_id > last_id) \
+                .order_by(Message.message_id).limit(batch_size).all()
+            if not messages:
+                return count
+            cls.index(messages)
+            db.session.commit()
+            count, last_id = count + len(messages), messages[-1].message_id
+    
+    @classmethod
+    def search(cls, q, room_ids):
+        """Return query of (message_id, matched terms, score) rows ranked by number of
+        matched words, their weight and recency. None if query has no words.
+        
+        :param q: search query.
+        :param room_ids: room identifier or selectable of room identifiers to search in.
+        """
+        terms = list(cls.tokenize(q))
+        if not terms:
+            return None
+        scope = cls.room_id == room_ids if isinstance(room_ids, int) else cls.room_id.in_(room_ids)
+        matched = db.func.count(cls.term).label("matched")
+        score = db.func.sum(cls.weight).label("score")
+        return cls.query.with_entities(cls.message_id, matched, score) \
+            .filter(cls.term.in_(terms), scope) \
+            .group_by(cls.message_id) \
+            .order_by(matched.desc(), score.desc(), cls.message_id.desc())
+    
+    
+class MessageArchive(db.Model):
+    """SQLAlchemy model to represent "message_archives" table.
+    Append-only storage of messages moved out of "messages" table. Every row is a segment
+    of consecutive room messages compressed together.
+    
+    :param archive_id: unique primary key.
+    :param room_id: [foreign key] room messages were sent identifier.
+    :param first_sent_at: date and time of the first message in segment.
+    :param first_message_id: identifier of the first message in segment.
+    :param last_sent_at: date and time of the last message in segment.
+    :param last_message_id: identifier of the last message in segment.
+    :param count: number of messages in segment.
+    :param payload: zlib compressed json list of messages.
+    :param created_at: date and time when segment was archived.
+    """
+    __tablename__ = "message_archives"
+    __table_args__ = (
+        db.Index("ix_message_archives_room_id_first", "room_id", "first_sent_at", "first_message_id"),
+        db.Index("ix_message_archives_room_id_last", "room_id", "last_sent_at", "last_message_id"),
+    )
+    
+    archive_id = db.Column(db.Integer, primary_key=True)
+    room_id = db.Column(db.Integer, db.ForeignKey("rooms.room_id", ondelete="CASCADE"))
+    first_sent_at = db.Column(db.DateTime)
+    first_message_id = db.Column(db.Integer)
+    last_sent_at = db.Column(db.DateTime)
+    last_message_id = db.Column(db.Integer)
+    count = db.Column(db.Integer)
+    payload = db.Column(db.LargeBinary)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @classmethod
+    def archive(cls, room_id, rows):
+        """Pack messages into new segment and delete them from "messages" table.
+        
+        :param room_id: unique room identifier.
+        :param rows: (message_id, text, sent_at, sender_id) rows in chronological order.
+        """
+        data = [[message_id, text, sent_at.isoformat(), sender_id] for message_id, text, sent_at, sender_id in rows]
+        segment = cls(room_id=room_id, count=len(rows),
+                      first_sent_at=rows[0].sent_at, first_message_id=rows[0].message_id,
+                      last_sent_at=rows[-1].sent_at, last_message_id=rows[-1].message_id,
+                      payload=zlib.compress(json.dumps(data).encode("utf-8")))
+        db.session.add(segment)
+        message_ids = [row.message_id for row in rows]
+        MessageTerm.query.filter(MessageTerm.message_id.in_(message_ids)).delete(synchronize_session=False)
+        Message.query.filter(Message.message_id.in_(message_ids)).delete()
+        return segment
+    
+    def unpack(self):
+        """Return segment messages as transient message objects."""
+        data = json.loads(zlib.decompress(self.payload))
+        return [Message(message_id=message_id, text=text, sent_at=datetime.fromisoformat(sent_at), 
+                        sender_id=sender_id, room_id=self.room_id) 
+                for message_id, text, sent_at, sender_id in data]
+    
+    @classmethod
+    def messages_before(cls, room_id, cursor, limit):
+        """Return up to limit archived messages older than cursor in chronological order.
+        
+        :param room_id: unique room identifier.
+        :param cursor: (sent_at, message_id) cursor or None to start from the newest.
+        :param limit: maximum number of messages.
+        """
+        query = cls.query.filter_by(room_id=room_id)
+        if cursor is not None:
+            sent_at, message_id = cursor
+            query = query.filter(db.or_(cls.first_sent_at < sent_at, 
+                                        db.and_(cls.first_sent_at == sent_at, cls.first_message_id < message_id)))
+        messages = []
+        for segment in query.order_by(cls.first_sent_at.desc(), cls.first_message_id.desc()).yield_per(8):
+            older = [m for m in segment.unpack() if cursor is None or (m.sent_at, m.message_id) < cursor]
+            messages = older[-(limit - len(messages)):] + messages
+            if len(messages) >= limit:
+                break
+        return messages
+    
+    @classmethod
+    def messages_after(cls, room_id, cursor, limit):
+        """Return up to limit archived messages newer than cursor in chronological order.
+        
+        :param room_id: unique room identifier.
+        :param cursor: (sent_at, message_id) cursor.
+        :param limit: maximum number of messages.
+        """
+        sent_at, message_id = cursor
+        query = cls.query.filter_by(room_id=room_id).filter(
+            db.or_(cls.last_sent_at > sent_at, 
+                   db.and_(cls.last_sent_at == sent_at, cls.last_message_id > message_id)))
+        messages = []
+        for segment in query.order_by(cls.first_sent_at, cls.first_message_id).yield_per(8):
+            newer = [m for m in segment.unpack() if (m.sent_at, m.message_id) > cursor]
+            messages += newer[:limit - len(messages)]
+            if len(messages) >= limit:
+                break
+        return messages
     
     
 class User(UserMixin, db.Model):
@@ -120,6 +349,7 @@ class User(UserMixin, db.Model):
     :param name: full user name.
     :param password: user password.
     :param password_hash: hash value of user password.
+    :param updated_at: date and time when user row was changed.
     :param rooms_owned: sqlalchemy orm relationship with "rooms" table.
     :param messages: sqlalchemy orm relationship with "messages" table.
     """
@@ -136,6 +366,7 @@ class User(UserMixin, db.Model):
     name = db.Column(db.String(64))
     password = db.Column(db.String(64))
     password_hash = db.Column(db.String(128))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     rooms_owned = db.relationship("Room", backref="creator", cascade="all,delete", lazy="dynamic")
     messages = db.relationship("Message", backref="sender", cascade="all,delete", lazy="dynamic")
@@ -212,6 +443,7 @@ class User(UserMixin, db.Model):
         if self.user_id != data["user_id"]:
             return False 
         self.email = data["email"]
+        self.gravatar_hash = hashlib.md5(self.email.encode("utf-8")).hexdigest()
         db.session.add(self)
         return True
     
@@ -278,9 +510,12 @@ class User(UserMixin, db.Model):
         self.password_hash = generate_password_hash(password)
     
     def ping(self):
-        """User last seen tracker."""
-        self.last_seen = datetime.utcnow()
-        db.session.add(self)
+        """User last seen tracker. Written with UPDATE statement instead of flush,
+        so bookkeeping write does not pin user reads to primary database.
+        updated_at is kept, last seen time alone does not change user page.
+        """
+        db.session.execute(db.update(User).where(User.user_id == self.user_id)
+                           .values(last_seen=datetime.utcnow(), updated_at=User.updated_at))
     
     def verify_password(self, password):
         """Check if user enter right password."""
@@ -0,0 +1,430 @@
+import json
+import mmap
+import os
+import struct
+import zlib
+from datetime import datetime
+from itertools import takewhile
+from queue import Empty, Queue
+from threading import Condition, Lock
+from time import sleep
+
+from flask import current_app
+
+from .extensions import sio
+from .models import db, Message, MessageTerm, Room
+
+# Record header: sequence number, payload length, payload crc32.
+HEADER = struct.Struct("<QII")
+
+
+def iter_records(buf):
+    """Yield (seq, payload, end offset) for every valid record in buffer.
+    Stop at the first torn or corrupted record.
+
+    :param buf: bytes-like segment content.
+    """
+    offset = 0
+    while offset + HEADER.size <= len(buf):
+        seq, length, crc = HEADER.unpack_from(buf, offset)
+        start = offset + HEADER.size
+        payload = buf[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            return
+        offset = start + length
+        yield seq, payload, offset
+
+
+class SegmentLog:
+    """Append-only log stored in segment files named by first record sequence number.
+
+    Writes are group committed: writer waits until some fsync covers its record,
+    and one fsync covers every record written while previous fsync was running.
+
+    :param path: log directory.
+    :param segment_size: segment file size in bytes to roll new segment after.
+    :param fsync_delay: seconds to wait for more records before fsync.
+    """
+    def __init__(self, path, segment_size=64 * 1024 * 1024, fsync_delay=0):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.segment_size = segment_size
+        self.fsync_delay = fsync_delay
+        self._cond = Condition()
+        self._syncing = False
+        self._open()
+
+    def segments(self):
+        """Return sorted list of (first_seq, file path) of log segments."""
+        names = (name for name in os.listdir(self.path) if name.endswith(".log"))
+        return sorted((int(name[:-4]), os.path.join(self.path, name)) for name in names)
+
+    def _open(self):
+        """Open last segment for appending, truncating torn record at its tail."""
+        segments = self.segments()
+        if not segments:
+            self._written = 0
+            self._file = open(self._segment_path(1), "ab")
+            self._size = 0
+        else:
+            first, path = segments[-1]
+            self._written, self._size = first - 1, 0
+            with open(path, "rb") as f:
+                for seq, _, end in iter_records(f.read()):
+                    self._written, self._size = seq, end
+            self._file = open(path, "ab")
+            self._file.truncate(self._size)
+        self._synced = self._written
+
+    def _segment_path(self, first_seq):
+        return os.path.join(self.path, f"{first_seq:020d}.log")
+
+    def _roll(self, first_seq):
+        """Close current segment and start new one. Caller must hold the lock."""
+        while self._syncing:
+            self._cond.wait()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._synced = self._written
+        self._file = open(self._segment_path(first_seq), "ab")
+        self._size = 0
+
+    @property
+    def last_seq(self):
+        """Sequence number of the last written record."""
+        return self._written
+
+    def write(self, record):
+        """Write record without waiting for fsync. Return record sequence number.
+
+        :param record: json serializable record.
+        """
+        payload = json.dumps(record).encode("utf-8")
+        with self._cond:
+            seq = self._written + 1
+            if self._size >= self.segment_size:
+                self._roll(seq)
+            self._file.write(HEADER.pack(seq, len(payload), zlib.crc32(payload)) + payload)
+            self._file.flush()
+            self._size += HEADER.size + len(payload)
+            self._written = seq
+        return seq
+
+    def sync(self, seq):
+        """Block until record with given sequence number is on disk.
+
+        :param seq: record sequence number.
+        """
+        with self._cond:
+            while self._synced < seq:
+                if self._syncing:
+                    self._cond.wait()
+                    continue
+                self._syncing = True
+                self._cond.release()
+                try:
+                    if self.fsync_delay:
+                        sleep(self.fsync_delay)
+                    with self._cond:
+                        target, fd = self._written, self._file.fileno()
+                    os.fsync(fd)
+                finally:
+                    self._cond.acquire()
+                    self._syncing = False
+                    self._cond.notify_all()
+                self._synced = max(self._synced, target)
+
+    def append(self, record):
+        """Write record and wait until it is durable. Return record sequence number.
+
+        :param record: json serializable record.
+        """
+        seq = self.write(record)
+        self.sync(seq)
+        return seq
+
+    def read(self, after=0):
+        """Yield (seq, record) for records with sequence number greater than after.
+        Segments are read through memory map.
+
+        :param after: sequence number to start after.
+        """
+        segments = self.segments()
+        for i, (first, path) in enumerate(segments):
+            if i + 1 < len(segments) and segments[i + 1][0] <= after + 1:
+                continue
+            with open(path, "rb") as f:
+                if not os.fstat(f.fileno()).st_size:
+                    continue
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                    for seq, payload, _ in iter_records(buf):
+                        if seq > after:
+                            yield seq, json.loads(payload)
+
+    def read_checkpoint(self):
+        """Return sequence number of the last materialized record."""
+        try:
+            with open(os.path.join(self.path, "checkpoint")) as f:
+                return int(f.read() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def write_checkpoint(self, seq):
+        """Atomically store sequence number of the last materialized record.
+
+        :param seq: record sequence number.
+        """
+        path = os.path.join(self.path, "checkpoint")
+        with open(path + ".tmp", "w") as f:
+            f.write(str(seq))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    def compact(self, upto):
+        """Remove segments containing only records up to given sequence number.
+
+        :param upto: sequence number of the last record allowed to be removed.
+        """
+        segments = self.segments()
+        for (first, path), (next_first, _) in zip(segments, segments[1:]):
+            if next_first - 1 > upto:
+                break
+            os.remove(path)
+
+    def close(self):
+        with self._cond:
+            self._file.close()
+
+
+def batches(entries, size):
+    """Split iterable into lists of at most given size.
+
+    :param entries: iterable of (seq, record).
+    :param size: maximum batch size.
+    """
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class MessageLog:
+    """Optional durable log on chat send path.
+
+    When MESSAGE_LOG_DIR is set, new messages are acknowledged as soon as they
+    are in the log and background task materializes them into "messages" table.
+    Background task starts from checkpoint, so records left by previous process
+    are materialized first and checkpoint never moves past unmaterialized records. Batch failing
+    MESSAGE_LOG_RETRIES times is inserted record by record, and records which
+    still fail are written to dead letter file next to the log.
+    """
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Open message log if it's enabled in application config."""
+        path = app.config.get("MESSAGE_LOG_DIR")
+        if not path:
+            app.extensions["msglog"] = None
+            return
+        log = SegmentLog(path, app.config.get("MESSAGE_LOG_SEGMENT_SIZE", 64 * 1024 * 1024),
+                         app.config.get("MESSAGE_LOG_FSYNC_DELAY", 0))
+        app.extensions["msglog"] = {
+            "log": log,
+            "queue": Queue(),
+            "lock": Lock(),
+            "materializer": None
+        }
+
+    @property
+    def state(self):
+        return current_app.extensions["msglog"]
+
+    @property
+    def enabled(self):
+        return self.state is not None
+
+    def append(self, room_id, sender_id, text):
+        """Durably log new message and queue it for materialization.
+        Return transient message object.
+
+        :param room_id: unique room identifier.
+        :param sender_id: unique sender identifier.
+        :param text: message body.
+        """
+        state = self.state
+        message = Message(text=text, sender_id=sender_id, room_id=room_id, sent_at=datetime.utcnow())
+        record = {"room_id": room_id, "sender_id": sender_id, "text": text,
+                  "sent_at": message.sent_at.isoformat()}
+        # Queue order must follow log order for checkpoint to be contiguous.
+        with state["lock"]:
+            seq = state["log"].write(record)
+            state["queue"].put((seq, record))
+            if state["materializer"] is None:
+                app = current_app._get_current_object()
+                state["materializer"] = sio.start_background_task(self.materialize_forever, app)
+        state["log"].sync(seq)
+        return message
+
+    def _check_contiguous(self, records):
+        """Raise RuntimeError unless records directly follow checkpoint without gaps.
+
+        :param records: list of (seq, record) in log order.
+        """
+        checkpoint = self.state["log"].read_checkpoint()
+        seqs = [seq for seq, _ in records]
+        if seqs != list(range(checkpoint + 1, checkpoint + len(seqs) + 1)):
+            raise RuntimeError(f"Records {seqs[0]}-{seqs[-1]} do not directly follow checkpoint {checkpoint}.")
+
+    def _advance(self, seq):
+        """Move checkpoint to given sequence number and remove materialized segments."""
+        log = self.state["log"]
+        log.write_checkpoint(seq)
+        log.compact(seq)
+
+    @staticmethod
+    def _insert(records):
+        """Insert logged messages into database and commit. Messages of deleted rooms are dropped.
+
+        :param records: list of (seq, record) in log order.
+        """
+        room_ids = {record["room_id"] for _, record in records}
+        rooms = Room.query.filter(Room.room_id.in_(room_ids)).all()
+        existing = {room.room_id for room in rooms}
+        dropped = [seq for seq, record in records if record["room_id"] not in existing]
+        if dropped:
+            current_app.logger.warning("Dropped logged messages %s sent to deleted rooms.", dropped)
+        messages = [Message(text=record["text"], sender_id=record["sender_id"], room_id=record["room_id"],
+                            sent_at=datetime.fromisoformat(record["sent_at"]))
+                    for _, record in records if record["room_id"] in existing]
+        db.session.add_all(messages)
+        db.session.flush()
+        MessageTerm.index(messages)
+        for room in rooms:
+            room.clean()
+        db.session.commit()
+
+    def materialize(self, records):
+        """Insert logged messages into database and move checkpoint.
+
+        :param records: list of (seq, record) in log order.
+        """
+        if not records:
+            return
+        self._check_contiguous(records)
+        self._insert(records)
+        self._advance(records[-1][0])
+
+    def materialize_each(self, records):
+        """Insert logged messages one by one, writing failed records to dead letter file,
+        and move checkpoint.
+
+        :param records: list of (seq, record) in log order.
+        """
+        if not records:
+            return
+        self._check_contiguous(records)
+        log = self.state["log"]
+        for seq, record in records:
+            try:
+                self._insert([(seq, record)])
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.exception("Logged message %s can not be materialized.", seq)
+                with open(os.path.join(log.path, "dead-letter.jsonl"), "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"seq": seq, "record": record, "error": repr(e)}) + "\n")
+        self._advance(records[-1][0])
+
+    def materialize_reliably(self, records):
+        """Materialize batch retrying MESSAGE_LOG_RETRIES times, then record by record.
+
+        :param records: list of (seq, record) in log order.
+        """
+        retries = current_app.config.get("MESSAGE_LOG_RETRIES", 3)
+        for attempt in range(1, retries + 1):
+            try:
+                self.materialize(records)
+                return
+            except Exception:
+                db.session.rollback()
+                current_app.logger.exception("Message log materialization failed, attempt %s of %s.",
+                                             attempt, retries)
+                if attempt < retries:
+                    sleep(1)
+        self.materialize_each(records)
+
+    def recover(self):
+        """Materialize every record written after checkpoint and not queued yet.
+        Queued records are discarded, they are read back from the log instead.
+        Return number of recovered messages.
+        """
+        state = self.state
+        log, queue = state["log"], state["queue"]
+        with state["lock"]:
+            try:
+                while True:
+                    queue.get_nowait()
+            except Empty:
+                pass
+            upto = log.last_seq
+        count = 0
+        entries = takewhile(lambda entry: entry[0] <= upto, log.read(after=log.read_checkpoint()))
+        for batch in batches(entries, current_app.config.get("MESSAGE_LOG_BATCH_SIZE", 100)):
+            self.materialize_reliably(batch)
+            db.session.remove()
+            count += len(batch)
+        return count
+
+    def drain(self):
+        """Materialize queued records as they arrive. Never returns."""
+        queue = self.state["queue"]
+        batch_size = current_app.config.get("MESSAGE_LOG_BATCH_SIZE", 100)
+        while True:
+            batch = [queue.get()]
+            try:
+                while len(batch) < batch_size:
+                    batch.append(queue.get_nowait())
+            except Empty:
+                pass
+            self.materialize_reliably(batch)
+            db.session.remove()
+
+    def materialize_forever(self, app):
+        """Background task materializing records after checkpoint and then draining materialization queue.
+        After unexpected error it starts over from checkpoint, so failed batch is not lost.
+
+        :param app: flask application object.
+        """
+        state = app.extensions["msglog"]
+        try:
+            with app.app_context():
+                while True:
+                    try:
+                        self.recover()
+                        self.drain()
+                    except Exception:
+                        db.session.rollback()
+                        db.session.remove()
+                        app.logger.exception("Message log materializer failed, restarting from checkpoint.")
+                        sleep(1)
+        finally:
+            state["materializer"] = None
+
+    def replay(self):
+        """Materialize every logged message after checkpoint. Return number of replayed messages."""
+        log = self.state["log"]
+        count = 0
+        for batch in batches(log.read(after=log.read_checkpoint()), current_app.config.get("MESSAGE_LOG_BATCH_SIZE", 100)):
+            self.materialize(batch)
+            count += len(batch)
+        return count
+
+
+msglog = MessageLog()
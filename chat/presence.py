@@ -0,0 +1,75 @@
+from threading import Lock
+
+from flask import current_app
+
+
+class Presence:
+    """In-memory tracker of users connected to rooms.
+
+    Every room keeps a dict of online user ids with number of their open
+    connections, so several tabs of one user count once. Connection
+    sids are mapped back to (room_id, user_id) to handle disconnects.
+    """
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register presence storage in application."""
+        app.extensions["presence"] = {"rooms": {}, "sids": {}, "lock": Lock()}
+
+    @property
+    def state(self):
+        return current_app.extensions["presence"]
+
+    def join(self, sid, room_id, user_id):
+        """Register new connection. Return True if user just came online.
+
+        :param sid: socket connection identifier.
+        :param room_id: unique room identifier.
+        :param user_id: unique user identifier.
+        """
+        state = self.state
+        with state["lock"]:
+            state["sids"][sid] = (room_id, user_id)
+            users = state["rooms"].setdefault(room_id, {})
+            users[user_id] = users.get(user_id, 0) + 1
+            return users[user_id] == 1
+
+    def leave(self, sid):
+        """Unregister connection. Return (room_id, user_id) if user went offline.
+
+        :param sid: socket connection identifier.
+        """
+        state = self.state
+        with state["lock"]:
+            entry = state["sids"].pop(sid, None)
+            if entry is None:
+                return None
+            room_id, user_id = entry
+            users = state["rooms"][room_id]
+            users[user_id] -= 1
+            if users[user_id]:
+                return None
+            del users[user_id]
+            if not users:
+                del state["rooms"][room_id]
+            return entry
+
+    def count(self, room_id):
+        """Return number of users online in the room.
+
+        :param room_id: unique room identifier.
+        """
+        return len(self.state["rooms"].get(room_id, ()))
+
+    def is_online(self, room_id, user_id):
+        """Check if user is connected to the room.
+
+        :param room_id: unique room identifier.
+        :param user_id: unique user identifier.
+        """
+        return user_id in self.state["rooms"].get(room_id, ())
+
+
+presence = Presence()
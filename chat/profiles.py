@@ -0,0 +1,93 @@
+from flask import current_app
+
+from .cache import LRUCache
+from .models import User
+
+# Avatar sizes used by templates and socket payloads.
+AVATAR_SIZES = (25, 30)
+
+
+class ProfileCache:
+    """Cache of user render profiles shared by templates and socket events.
+
+    Profile is a plain dict with username, full name and gravatar urls
+    for every size in AVATAR_SIZES, so rendering a message doesn't
+    need user object.
+    """
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register cache storage and template global in application."""
+        app.extensions["profiles"] = LRUCache(app.config.get("PROFILE_CACHE_SIZE", 1024))
+        app.add_template_global(self.display, "profile")
+
+    @property
+    def cache(self):
+        return current_app.extensions["profiles"]
+
+    @staticmethod
+    def build(user):
+        """Build render profile from user object.
+
+        :param user: user object.
+        """
+        return {
+            "user_id": user.user_id,
+            "username": user.username,
+            "name": user.name,
+            "avatars": {size: user.gravatar_url(size) for size in AVATAR_SIZES}
+        }
+
+    def get(self, user_id):
+        """Return cached render profile, load user from database on cache miss.
+
+        :param user_id: unique user identifier.
+        """
+        profile = self.cache.get(user_id)
+        if profile is None:
+            user = User.query.get(user_id)
+            if user is None:
+                return None
+            profile = self.refresh(user)
+        return profile
+
+    @staticmethod
+    def placeholder(user_id):
+        """Build render profile shown in place of deleted user.
+
+        :param user_id: unique identifier of deleted user.
+        """
+        return {
+            "user_id": user_id,
+            "username": "deleted",
+            "name": None,
+            "avatars": {size: f"https://www.gravatar.com/avatar/?s={size}&d=mp&f=y" for size in AVATAR_SIZES}
+        }
+
+    def display(self, user_id):
+        """Return render profile of user or placeholder profile if user was deleted.
+
+        :param user_id: unique user identifier.
+        """
+        return self.get(user_id) or self.placeholder(user_id)
+
+    def refresh(self, user):
+        """Rebuild user profile. Call it after user info has been changed.
+
+        :param user: user object.
+        """
+        profile = self.build(user)
+        self.cache.set(user.user_id, profile)
+        return profile
+
+    def invalidate(self, user_id):
+        """Remove user profile from cache.
+
+        :param user_id: unique user identifier.
+        """
+        self.cache.delete(user_id)
+
+
+profiles = ProfileCache()
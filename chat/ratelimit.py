@@ -0,0 +1,86 @@
+from collections import Counter
+from threading import Lock
+from time import monotonic
+
+from flask import current_app
+
+from .cache import LRUCache
+
+
+class MemoryBackend:
+    """In-process token bucket storage.
+
+    Buckets are kept in LRU cache, so memory stays bounded no matter
+    how many users and rooms have been seen. Every check is O(1).
+
+    :param maxsize: maximum number of buckets kept in memory.
+    """
+    def __init__(self, maxsize=10000):
+        self.buckets = LRUCache(maxsize)
+        self._lock = Lock()
+
+    def consume(self, key, rate, burst):
+        """Take one token from bucket. Return False if bucket is empty.
+
+        :param key: bucket identifier.
+        :param rate: tokens added per second.
+        :param burst: bucket capacity.
+        """
+        now = monotonic()
+        with self._lock:
+            tokens, updated = self.buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets.set(key, (tokens, now))
+        return allowed
+
+
+# Rate limiter storage backends. Shared backends for multi-worker
+# deployments can be registered here under their config name.
+backends = {
+    "memory": MemoryBackend
+}
+
+
+class RateLimiter:
+    """Per user and per room token bucket limiter for socket events."""
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Create limiter backend and rejection counters for application."""
+        backend = backends[app.config.get("RATELIMIT_BACKEND", "memory")]
+        app.extensions["ratelimit"] = {
+            "backend": backend(app.config.get("RATELIMIT_MAX_BUCKETS", 10000)),
+            "rejections": Counter()
+        }
+
+    @property
+    def rejections(self):
+        """Number of rejected events by limit scope."""
+        return current_app.extensions["ratelimit"]["rejections"]
+
+    def allow(self, user_id, room_id):
+        """Check if user is allowed to send message to the room.
+
+        :param user_id: unique user identifier.
+        :param room_id: unique room identifier.
+        """
+        state = current_app.extensions["ratelimit"]
+        config = current_app.config
+        limits = [
+            ("user", user_id, config.get("USER_MESSAGE_RATE", 1), config.get("USER_MESSAGE_BURST", 5)),
+            ("room", room_id, config.get("ROOM_MESSAGE_RATE", 20), config.get("ROOM_MESSAGE_BURST", 50))
+        ]
+        for scope, key, rate, burst in limits:
+            if not state["backend"].consume((scope, key), rate, burst):
+                state["rejections"][scope] += 1
+                current_app.logger.info("Message rate limit exceeded for %s %s.", scope, key)
+                return False
+        return True
+
+
+limiter = RateLimiter()
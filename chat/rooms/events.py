@@ -1,9 +1,16 @@
-from flask import session
+from flask import request, session
+from flask_babel import gettext
 from flask_login import current_user
-from flask_socketio import join_room, leave_room
+from flask_socketio import emit, join_room, leave_room
 
 from ..extensions import sio 
-from ..models import db, Room, Message
+from ..models import db, Room, Message, MessageTerm
+from ..msglog import msglog
+from ..presence import presence
+from ..profiles import profiles
+from ..ratelimit import limiter
+from ..trending import trending
+from ..utils import message_to_json
 
 
 @sio.on("connect", namespace="/room")
@@ -11,23 +18,47 @@ def on_connect():
     """SocketIO on connect event. Envoke when user connect to the page."""
     room = session.get("room")
     join_room(room)
+    # Membership is checked once per connection, joining room reloads the page.
+    session["is_participant"] = Room.is_participant(room, current_user)
+    if current_user.is_authenticated and presence.join(request.sid, room, current_user.user_id):
+        emit_presence("join", room, current_user.user_id)
+
+
+def emit_presence(action, room, user_id):
+    """Broadcast presence change to the room.
+    
+    :param action: "join" or "leave".
+    :param room: unique room identifier.
+    :param user_id: unique identifier of user whose presence changed.
+    """
+    ctx = {
+        "action": action,
+        "username": profiles.display(user_id)["username"],
+        "online": presence.count(room)
+    }
+    sio.emit("presence", ctx, namespace="/room", to=room)
    
    
 @sio.on("new-message", namespace="/room")
 def on_new_message(data):
     """SocketIO on new message event. Envoke when user send new message to the room."""
+    if not session.get("is_participant"):
+        return
     room = Room.query.get_or_404(session.get("room"))
-    message = Message(text=data.get("msg"), sender=current_user, room=room)
-    db.session.add(message)
-    room.clean()
-    db.session.commit()
-    ctx = {
-        "msg": message.text,
-        "username": current_user.username,
-        "sent_at": str(message.sent_at),
-        "avatar": current_user.gravatar_url(25)
-    }
-    sio.emit("new_message", ctx, namespace="/room", to=room.room_id)
+    if not limiter.allow(current_user.user_id, room.room_id):
+        emit("rate_limited", {"msg": gettext("You are sending messages too fast.")})
+        return
+    if msglog.enabled:
+        message = msglog.append(room.room_id, current_user.user_id, data.get("msg"))
+    else:
+        message = Message(text=data.get("msg"), sender=current_user, room=room)
+        db.session.add(message)
+        db.session.flush()
+        MessageTerm.index([message])
+        room.clean()
+        db.session.commit()
+    trending.record(room.room_id)
+    sio.emit("new_message", message_to_json(message), namespace="/room", to=room.room_id)
         
         
 @sio.on("disconnect", namespace="/room")
@@ -35,4 +66,7 @@ def on_disconnect():
     """SocketIO on disconnect event. Envoke when user disconnect from the page."""
     room = session.get("room")
     leave_room(room)
+    went_offline = presence.leave(request.sid)
+    if went_offline is not None:
+        emit_presence("leave", *went_offline)
     
\ No newline at end of file
@@ -3,7 +3,7 @@ from flask_wtf import FlaskForm
 from wtforms.fields import StringField, TextAreaField, SelectField, SubmitField
 from wtforms.validators import DataRequired, Length
 
-from ..models import Category
+from ..categories import categories
 
 
 class CreateRoomForm(FlaskForm):
@@ -21,5 +21,5 @@ class CreateRoomForm(FlaskForm):
     
     def __init__(self, *args, **kwargs):
         super(CreateRoomForm, self).__init__(*args, **kwargs)
-        self.category.choices = [(category.category_id, category.name) for category in Category.query.order_by(Category.name).all()]
+        self.category.choices = categories.choices()
     
\ No newline at end of file
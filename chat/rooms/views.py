@@ -1,10 +1,15 @@
-from flask import current_app, flash, render_template, redirect, request, url_for, session
+from flask import abort, current_app, flash, jsonify, render_template, redirect, request, url_for, session
 from flask_babel import gettext
 from flask_login import current_user, login_required
 
 from . import rooms
 from .forms import CreateRoomForm
-from ..models import db, Category, Room
+from ..categories import categories
+from ..conditional import conditional, newest, site_version
+from ..fragments import fragments, ROOM_FRAGMENTS
+from ..models import db, participants, Message, MessageArchive, MessageTerm, Room
+from ..presence import presence
+from ..utils import message_to_json, stream_page
 
 
 @rooms.route("/rooms/create", methods=["GET", "POST"])
@@ -17,14 +22,14 @@ def create_room():
     """
     form = CreateRoomForm()
     if form.validate_on_submit():
-        category = Category.query.get(form.category.data)
         room = Room(name=form.name.data,
                     description=form.description.data,
-                    category=category,
+                    category_id=form.category.data,
                     creator=current_user) 
         room.users.append(current_user)
         db.session.add(room)
         db.session.commit()
+        invalidate_room(room.room_id)
         flash(gettext("Room successfully created."), "success")
         return redirect(url_for("main.index"))
     return render_template("rooms/create_room.html", form=form)
@@ -38,7 +43,134 @@ def room(room_id):
     """
     room = Room.query.get_or_404(room_id)
     session["room"] = room.room_id
-    return render_template("rooms/room.html", room=room)
+    is_participant = Room.is_participant(room.room_id, current_user)
+    online = presence.count(room.room_id)
+    latest = room.messages.order_by(Message.sent_at.desc(), Message.message_id.desc()).first()
+    response = conditional.not_modified(room.updated_at, latest and latest.cursor, online, is_participant, *site_version(),
+                                        last_modified=newest(room.updated_at, latest and latest.sent_at))
+    if response is not None:
+        return response
+    pagination = paginate_participants(room, page=1)
+    messages = messages_page(room)
+    return stream_page("rooms/room.html", room=room, online=online,
+                       is_participant=is_participant, participants=pagination, messages=messages)
+
+
+@rooms.route("/rooms/<room_id>/messages")
+def room_messages(room_id):
+    """Room message history API route handler.
+    
+    :GET - return json page of messages sent before or after cursor given in query string.
+    """
+    room = Room.query.get_or_404(room_id)
+    before, after = request.args.get("before"), request.args.get("after")
+    cursor = before or after
+    if cursor is not None:
+        cursor = Message.parse_cursor(cursor)
+        if cursor is None:
+            abort(400)
+    messages = messages_page(room, before=cursor if before else None, after=cursor if after else None)
+    return jsonify({
+        "messages": [message_to_json(message) for message in messages],
+        "before": messages[0].cursor if messages else None,
+        "after": messages[-1].cursor if messages else None
+    })
+
+
+def messages_page(room, before=None, after=None):
+    """Return page of room messages in chronological order using keyset pagination.
+    Newest messages are returned when no cursor given. Messages missing in "messages"
+    table are taken from archive.
+    
+    :param room: room object.
+    :param before: (sent_at, message_id) cursor to return messages older than.
+    :param after: (sent_at, message_id) cursor to return messages newer than.
+    """
+    query = room.messages
+    limit = current_app.config["MESSAGES_PER_PAGE"]
+    if after is not None:
+        messages = MessageArchive.messages_after(room.room_id, after, limit)
+        sent_at, message_id = (messages[-1].sent_at, messages[-1].message_id) if messages else after
+        query = query.filter(db.or_(Message.sent_at > sent_at, 
+                                    db.and_(Message.sent_at == sent_at, Message.message_id > message_id)))
+        return messages + query.order_by(Message.sent_at, Message.message_id).limit(limit - len(messages)).all()
+    if before is not None:
+        sent_at, message_id = before
+        query = query.filter(db.or_(Message.sent_at < sent_at, 
+                                    db.and_(Message.sent_at == sent_at, Message.message_id < message_id)))
+    messages = query.order_by(Message.sent_at.desc(), Message.message_id.desc()).limit(limit).all()[::-1]
+    if len(messages) < limit:
+        cursor = (messages[0].sent_at, messages[0].message_id) if messages else before
+        messages = MessageArchive.messages_before(room.room_id, cursor, limit - len(messages)) + messages
+    return messages
+
+
+@rooms.route("/rooms/<room_id>/participants")
+def room_participants(room_id):
+    """Room participants API route handler.
+    
+    :GET - return json page of room participants with total participants count.
+    """
+    room = Room.query.get_or_404(room_id)
+    page = request.args.get("page", 1, type=int)
+    pagination = paginate_participants(room, page)
+    return jsonify({
+        "participants": [{"username": user.username, 
+                          "name": user.name, 
+                          "avatar": user.gravatar_url(size=30)} for user in pagination.items],
+        "total": pagination.total,
+        "next": pagination.next_num if pagination.has_next else None
+    })
+
+
+@rooms.route("/messages/search")
+def search_messages():
+    """Message search API route handler.
+    
+    :GET - return json page of ranked messages matching query in the room given by room_id 
+           or, if room is not given, in rooms of current user.
+    """
+    q = request.args.get("q", "")
+    page = request.args.get("page", 1, type=int)
+    room_id = request.args.get("room_id", type=int)
+    if room_id is not None:
+        scope = Room.query.get_or_404(room_id).room_id
+    elif current_user.is_authenticated:
+        scope = db.select(participants.c.room_id).where(participants.c.user_id == current_user.user_id)
+    else:
+        abort(401)
+    query = MessageTerm.search(q, scope)
+    if query is None:
+        return jsonify({"messages": [], "total": 0, "next": None})
+    pagination = query.paginate(page=page, per_page=current_app.config["MESSAGES_PER_PAGE"], error_out=False)
+    message_ids = [row.message_id for row in pagination.items]
+    messages = {message.message_id: message for message in Message.query.filter(Message.message_id.in_(message_ids))}
+    return jsonify({
+        "messages": [dict(message_to_json(messages[message_id]), room_id=messages[message_id].room_id) 
+                     for message_id in message_ids if message_id in messages],
+        "total": pagination.total,
+        "next": pagination.next_num if pagination.has_next else None
+    })
+
+
+def invalidate_room(room_id):
+    """Drop cached fragments of the room after it was created, changed or deleted.
+    
+    :param room_id: unique room identifier.
+    """
+    for name in ROOM_FRAGMENTS:
+        fragments.invalidate(name, room_id)
+
+
+def paginate_participants(room, page):
+    """Return page of room participants ordered by participants primary key.
+    
+    :param room: room object.
+    :param page: page number.
+    """
+    return room.users.order_by(participants.c.user_id).paginate(
+        page=page, per_page=current_app.config["PARTICIPANTS_PER_PAGE"], error_out=False
+    )
 
 
 @rooms.route("/rooms/<room_id>/join")
@@ -49,10 +181,11 @@ def room_join(room_id):
     :GET - add user to the room participants and redirect to room page.
     """
     room = Room.query.get_or_404(room_id)
-    if not current_user in room.users:
+    if not Room.is_participant(room.room_id, current_user):
         room.users.append(current_user)
-        db.session.add(room)
+        room.touch()
         db.session.commit()
+        invalidate_room(room.room_id)
         flash(gettext("You have joined %(room)s.", room=room.name), "success") 
     return redirect(url_for("rooms.room", room_id=room_id))
 
@@ -63,9 +196,9 @@ def room_category(category_id):
     
     :GET - return rooms splited by categories.
     """
-    category = Category.query.get_or_404(category_id)
+    category = categories.get_or_404(category_id)
     page = request.args.get("page", 1, type=int)
-    pagination = Room.query.filter_by(category=category).order_by(Room.created_at.desc()).paginate(
+    pagination = Room.query.filter_by(category_id=category.category_id).order_by(Room.created_at.desc()).paginate(
         page=page, per_page=current_app.config["ROOMS_PER_PAGE"]
     )
     rooms = pagination.items
@@ -0,0 +1,100 @@
+import random
+import time
+from functools import partial
+
+from flask import has_request_context, session
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import event, orm
+from sqlalchemy.sql import Select
+
+# Flask session key holding time until which user reads go to primary database.
+STICKY_KEY = "_db_primary_until"
+
+
+class RoutingSession(SignallingSession):
+    """Session sending plain SELECT statements to one of replica binds and everything
+    else to primary database.
+
+    Reads go to primary after session has written anything (read-your-writes within
+    session) and, for REPLICA_STICKY_SECONDS after commit, for all requests of the
+    same user, so replication lag is never visible to the user who made a change.
+    Outside of request context (background tasks, cli commands) everything goes to
+    primary, since such code usually writes based on what it reads.
+    """
+    def __init__(self, db, autocommit=False, autoflush=True, **options):
+        self.db = db
+        self.replica = None
+        self.primary = False
+        super().__init__(db, autocommit=autocommit, autoflush=autoflush, **options)
+        event.listen(self, "after_flush", self._after_flush)
+        event.listen(self, "after_commit", self._after_commit)
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return bind
+        if self.use_replica(mapper, clause):
+            return self.db.get_engine(self.app, bind=self.replica)
+        return super().get_bind(mapper, clause)
+
+    def use_replica(self, mapper, clause):
+        """Check if statement can be sent to replica.
+
+        :param mapper: mapper of queried model.
+        :param clause: executed statement.
+        """
+        replicas = self.app.config.get("SQLALCHEMY_REPLICA_BINDS")
+        if not replicas or self.primary or self._flushing or not has_request_context():
+            return False
+        if not isinstance(clause, Select) or clause._for_update_arg is not None:
+            return False
+        if mapper is not None and mapper.persist_selectable.info.get("bind_key") is not None:
+            return False
+        if session.get(STICKY_KEY, 0) > time.time():
+            return False
+        if self.replica is None:
+            self.replica = random.choice(replicas)
+        return True
+
+    def _after_flush(self, db_session, flush_context):
+        self.primary = True
+
+    def _after_commit(self, db_session):
+        if self.primary and has_request_context():
+            session[STICKY_KEY] = time.time() + self.app.config.get("REPLICA_STICKY_SECONDS", 5)
+
+    def close(self):
+        super().close()
+        self.replica = None
+        self.primary = False
+
+
+def set_pragmas(pragmas, dbapi_connection, connection_record):
+    """Engine connect listener running PRAGMA statements on new SQLite connection.
+    
+    :param pragmas: dict of PRAGMA names and values.
+    """
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """Flask-SQLAlchemy extension using RoutingSession and applying SQLALCHEMY_PRAGMAS
+    to every SQLite connection.
+    """
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        sa_url, options = super().apply_driver_hacks(app, sa_url, options)
+        if sa_url.get_backend_name() == "sqlite" and app.config.get("SQLALCHEMY_PRAGMAS"):
+            options["pragmas"] = app.config["SQLALCHEMY_PRAGMAS"]
+        return sa_url, options
+
+    def create_engine(self, sa_url, engine_opts):
+        pragmas = engine_opts.pop("pragmas", None)
+        engine = super().create_engine(sa_url, engine_opts)
+        if pragmas:
+            event.listen(engine, "connect", partial(set_pragmas, pragmas))
+        return engine
@@ -0,0 +1,93 @@
+import time
+
+from flask import current_app, g, has_app_context
+from flask_babel import get_locale
+from flask_sqlalchemy import Pagination
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from .cache import LRUCache
+from .models import Room
+
+
+def normalize(q):
+    """Strip query and collapse repeated whitespace, so equivalent queries share cache entries."""
+    return " ".join(q.split())
+
+
+class SearchCache:
+    """Cache of room search result pages and total hit counts.
+
+    Page entries hold ids of found rooms and are keyed by normalized query,
+    page and locale. Hit count is cached per query, so moving between pages of
+    the same query skips COUNT statement. Entries expire after SEARCH_CACHE_TTL
+    seconds and whole cache is dropped when room is created or deleted.
+    """
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register empty caches in application."""
+        size = app.config.get("SEARCH_CACHE_SIZE", 256)
+        app.extensions["search"] = {
+            "pages": LRUCache(size),
+            "counts": LRUCache(size),
+            "ttl": app.config.get("SEARCH_CACHE_TTL", 30)
+        }
+
+    @property
+    def state(self):
+        return current_app.extensions["search"]
+
+    def _cached(self, cache, key, load):
+        """Return fresh cached value or load and cache it."""
+        now = time.monotonic()
+        entry = cache.get(key)
+        if entry is None or entry[0] <= now:
+            entry = (now + self.state["ttl"], load())
+            cache.set(key, entry)
+        return entry[1]
+
+    def paginate(self, q, page, per_page):
+        """Return pagination of rooms matching query.
+
+        :param q: query string to search.
+        :param page: page number starting from 1.
+        :param per_page: number of rooms on the page.
+        """
+        q = normalize(q)
+        query = Room.search(q)
+        state = self.state
+        total = self._cached(state["counts"], q, lambda: query.order_by(None).count())
+        locale = str(g.get("locale") or get_locale())
+        ids = self._cached(state["pages"], (q, page, per_page, locale), lambda: [
+            room_id for room_id, in query.with_entities(Room.room_id).order_by(Room.created_at.desc(), Room.room_id.desc())
+            .limit(per_page).offset((page - 1) * per_page)
+        ])
+        rooms = {room.room_id: room for room in Room.query.filter(Room.room_id.in_(ids))} if ids else {}
+        items = [rooms[room_id] for room_id in ids if room_id in rooms]
+        return Pagination(None, page, per_page, total, items)
+
+    def invalidate(self):
+        """Drop all cached pages and counts."""
+        if has_app_context() and "search" in current_app.extensions:
+            self.state["pages"].clear()
+            self.state["counts"].clear()
+
+
+search_cache = SearchCache()
+
+
+@event.listens_for(Room, "after_insert")
+@event.listens_for(Room, "after_delete")
+def rooms_changed(mapper, connection, target):
+    """Mark session which created or deleted rooms through ORM."""
+    object_session(target).info["search_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_search(session):
+    """Drop cached search results after room changes were committed."""
+    if session.info.pop("search_changed", False):
+        search_cache.invalidate()
@@ -0,0 +1,28 @@
+const search_input = document.querySelector("input[data-autocomplete]");
+if (search_input) {
+    const suggestions = document.getElementById(search_input.getAttribute("list"));
+    let rooms = {};
+    let timer = null;
+    search_input.oninput = (event) => {
+        const q = search_input.value.trim();
+        // Datalist selection is not typing: it has no inputType or replaces whole text.
+        const picked = event.inputType === undefined || event.inputType === "insertReplacementText";
+        if (picked && rooms[q]) {
+            // Suggestion picked from the list, go straight to the room.
+            window.location = rooms[q];
+            return;
+        }
+        clearTimeout(timer);
+        timer = setTimeout(async () => {
+            const response = await fetch(`${search_input.dataset.autocomplete}?q=${encodeURIComponent(q)}`);
+            const data = await response.json();
+            rooms = {};
+            suggestions.replaceChildren(...data.rooms.map((room) => {
+                rooms[room.name] = room.url;
+                const option = document.createElement("option");
+                option.value = room.name;
+                return option;
+            }));
+        }, 150);
+    };
+}
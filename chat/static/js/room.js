@@ -0,0 +1,97 @@
+const render_participant = (participant) => {
+    const row = document.createElement("div");
+    row.className = "row";
+    row.innerHTML = `<div class="col-md-2">
+                        <div class="rounded-img"><img alt="..."></div>
+                     </div>
+                     <div class="col-md-8"><p></p></div>`;
+    row.querySelector("img").src = participant.avatar;
+    const info = row.querySelector("p");
+    if (participant.name) {
+        info.append(participant.name, document.createElement("br"));
+    }
+    const link = document.createElement("a");
+    link.className = "username-link";
+    link.href = `/users/${encodeURIComponent(participant.username)}`;
+    link.style.fontSize = "16px";
+    link.textContent = `@${participant.username}`;
+    info.append(link);
+    return row;
+};
+
+const more_participants = document.querySelector("#more-participants");
+if (more_participants) {
+    more_participants.onclick = async () => {
+        more_participants.disabled = true;
+        const response = await fetch(`${more_participants.dataset.url}?page=${more_participants.dataset.page}`);
+        const data = await response.json();
+        const list = document.getElementById("participants");
+        const fragment = document.createDocumentFragment();
+        data.participants.forEach((participant) => fragment.append(render_participant(participant)));
+        list.append(fragment);
+        if (data.next) {
+            more_participants.dataset.page = data.next;
+            more_participants.disabled = false;
+        } else {
+            more_participants.remove();
+        }
+    };
+}
+
+const render_message = (data) => {
+    const message = document.createElement("div");
+    message.className = "message";
+    // Messages not yet materialized from message log have no cursor.
+    if (data.cursor) {
+        message.dataset.cursor = data.cursor;
+    }
+    message.innerHTML = `<div class="row">
+                            <div class="col-md-6">
+                                <img style="border-radius: 50%;" alt="...">
+                                <a class="username-link" style="font-size: 12px;"></a>
+                            </div>
+                            <div class="col-md-6" align="right"></div>
+                         </div>
+                         <div class="row">
+                            <div class="col-md-12"><p></p></div>
+                         </div>`;
+    message.querySelector("img").src = data.avatar;
+    const link = message.querySelector("a");
+    link.href = `/users/${encodeURIComponent(data.username)}`;
+    link.textContent = `@${data.username}`;
+    message.querySelector("[align=right]").textContent = moment(data.sent_at).fromNow();
+    message.querySelector("p").textContent = data.msg;
+    return message;
+};
+
+const chat_history = document.getElementById("chat");
+const history_area = chat_history.parentElement;
+let history_loading = false;
+
+const load_older_messages = async () => {
+    if (history_loading || !chat_history.dataset.before) {
+        return;
+    }
+    history_loading = true;
+    try {
+        const response = await fetch(`${chat_history.dataset.url}?before=${encodeURIComponent(chat_history.dataset.before)}`);
+        if (!response.ok) {
+            return;
+        }
+        const data = await response.json();
+        const fragment = document.createDocumentFragment();
+        data.messages.forEach((message) => fragment.append(render_message(message)));
+        const height = history_area.scrollHeight;
+        chat_history.prepend(fragment);
+        history_area.scrollTop += history_area.scrollHeight - height;
+        chat_history.dataset.before = data.before || "";
+    } finally {
+        history_loading = false;
+    }
+};
+
+history_area.addEventListener("scroll", () => {
+    if (history_area.scrollTop < 20) {
+        load_older_messages();
+    }
+});
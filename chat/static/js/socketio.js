@@ -1,42 +1,86 @@
 const sio = io("/room");
-window.location.href = "#last-message";
+const chat = document.getElementById("chat");
+const chat_area = chat.parentElement;
+// Maximum number of messages kept in the DOM, older ones are reloaded on scroll up.
+const chat_window = parseInt(chat.dataset.window, 10) || 200;
+let pending = [];
 
-const construct_username = (username, size) => {
-    return `<a class="username-link" href="/users/${username}" style="font-size: ${size}px;">@${username}</a>`;
-}
+const scroll_to_bottom = () => {
+    chat_area.scrollTop = chat_area.scrollHeight;
+};
+
+const at_bottom = () => chat_area.scrollHeight - chat_area.scrollTop - chat_area.clientHeight < 20;
+
+const trim_messages = () => {
+    const extra = chat.children.length - chat_window;
+    if (extra <= 0) {
+        return;
+    }
+    for (let i = 0; i < extra; i++) {
+        chat.firstElementChild.remove();
+    }
+    const oldest = chat.querySelector('[data-cursor]:not([data-cursor="null"])');
+    if (oldest) {
+        chat.dataset.before = oldest.dataset.cursor;
+    }
+};
+
+const flush_messages = () => {
+    const follow = at_bottom();
+    const fragment = document.createDocumentFragment();
+    fragment.append(...pending);
+    pending = [];
+    chat.append(fragment);
+    // Window is trimmed only while following new messages, so reading history is not disturbed.
+    if (follow) {
+        trim_messages();
+        scroll_to_bottom();
+    }
+};
+
+const queue_message = (node) => {
+    if (!pending.length) {
+        requestAnimationFrame(flush_messages);
+    }
+    pending.push(node);
+};
+
+const render_notice = (text, italic) => {
+    const notice = document.createElement("p");
+    if (italic) {
+        const i = document.createElement("i");
+        i.textContent = text;
+        notice.append(i);
+    } else {
+        notice.textContent = text;
+    }
+    return notice;
+};
+
+scroll_to_bottom();
 
 sio.on("message", (data) => {
-    const chat = document.getElementById("chat");
-    chat.innerHTML += `<p>${data.msg}</p>`;
-    window.location.href = "#last-message";
+    queue_message(render_notice(data.msg, false));
+});
+
+sio.on("presence", (data) => {
+    document.getElementById("online-count").textContent = data.online;
+});
+
+sio.on("rate_limited", (data) => {
+    queue_message(render_notice(data.msg, true));
 });
 
 sio.on("new_message", (data) => {
-    const chat =  document.getElementById("chat");
-    let message = `<div class="row">
-                        <div class="col-md-6">
-                            <img style="border-radius: 50%;" src="${data.avatar}" alt="...">
-                            ${construct_username(data.username, 12)}
-                        </div>
-                        <div class="col-md-6" align="right">
-                            ${moment(data.sent_at).fromNow(refresh=true)}
-                        </div>
-                    </div>
-                    <div class="row">
-                        <div class="col-md-12">
-                            <p>${data.msg}</p>
-                        </div>
-                    </div>`;
-    chat.innerHTML += message;
-    window.location.href = "#last-message";
+    queue_message(render_message(data));
 });
 
-document.querySelector("#send-message").onclick = () => {
-    const msg = document.querySelector("#message");
-    const data = {
-        msg: msg.value
+const send_message = document.querySelector("#send-message");
+if (send_message) {
+    send_message.onclick = () => {
+        const msg = document.querySelector("#message");
+        sio.emit("new-message", {msg: msg.value});
+        msg.value = "";
+        scroll_to_bottom();
     };
-    sio.emit("new-message", data);
-    msg.value = "";
-    window.location.href = "#last-message";
-};
\ No newline at end of file
+}
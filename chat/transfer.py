@@ -0,0 +1,144 @@
+import base64
+import csv
+import json
+import os
+from datetime import datetime
+
+from .models import db
+
+# Tables in dependency order, so rows can be inserted as they are read.
+TABLES = ["users", "categories", "rooms", "participants", "messages", "message_terms", "message_archives"]
+
+
+def encode(value):
+    """Convert column value to json/csv friendly representation."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    return value
+
+
+def decode(column, value):
+    """Convert exported value back to python type of the column.
+
+    :param column: sqlalchemy column object.
+    :param value: exported value.
+    """
+    if value is None or (value == "" and not isinstance(column.type, db.String)):
+        return None
+    if isinstance(column.type, db.DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, db.LargeBinary):
+        return base64.b64decode(value)
+    if isinstance(column.type, db.Boolean) and isinstance(value, str):
+        return value in ("True", "true", "1")
+    if isinstance(column.type, db.Integer):
+        return int(value)
+    return value
+
+
+def iter_rows(table, batch_size):
+    """Stream table rows as dicts using server-side cursor where database supports it.
+
+    :param table: sqlalchemy table object.
+    :param batch_size: number of rows fetched at once.
+    """
+    connection = db.session.connection().execution_options(stream_results=True)
+    result = connection.execute(table.select().order_by(*table.primary_key.columns))
+    for partition in result.mappings().partitions(batch_size):
+        for row in partition:
+            yield {key: encode(value) for key, value in row.items()}
+
+
+def export_data(path, fmt="jsonl", batch_size=1000):
+    """Export database to jsonl file or directory with csv file per table.
+    Return dict with number of exported rows per table.
+
+    :param path: jsonl file or csv directory path.
+    :param fmt: "jsonl" or "csv".
+    :param batch_size: number of rows fetched at once.
+    """
+    counts = dict.fromkeys(TABLES, 0)
+    if fmt == "jsonl":
+        with open(path, "w", encoding="utf-8") as f:
+            for name in TABLES:
+                for row in iter_rows(db.metadata.tables[name], batch_size):
+                    f.write(json.dumps({"table": name, "row": row}) + "\n")
+                    counts[name] += 1
+        return counts
+    os.makedirs(path, exist_ok=True)
+    for name in TABLES:
+        table = db.metadata.tables[name]
+        with open(os.path.join(path, f"{name}.csv"), "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=table.columns.keys())
+            writer.writeheader()
+            for row in iter_rows(table, batch_size):
+                writer.writerow(row)
+                counts[name] += 1
+    return counts
+
+
+def iter_import(path, fmt):
+    """Yield (table name, row) pairs from exported data.
+
+    :param path: jsonl file or csv directory path.
+    :param fmt: "jsonl" or "csv".
+    """
+    if fmt == "jsonl":
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record["table"], record["row"]
+        return
+    for name in TABLES:
+        filename = os.path.join(path, f"{name}.csv")
+        if os.path.exists(filename):
+            with open(filename, encoding="utf-8", newline="") as f:
+                for row in csv.DictReader(f):
+                    yield name, row
+
+
+def import_data(path, fmt="jsonl", batch_size=1000):
+    """Import exported data with batched inserts. Return dict with number of imported rows per table.
+
+    :param path: jsonl file or csv directory path.
+    :param fmt: "jsonl" or "csv".
+    :param batch_size: number of rows inserted at once.
+    """
+    counts = dict.fromkeys(TABLES, 0)
+    table, batch = None, []
+
+    def flush():
+        if batch:
+            db.session.execute(table.insert(), batch)
+            db.session.commit()
+            counts[table.name] += len(batch)
+            batch.clear()
+
+    for name, row in iter_import(path, fmt):
+        if table is None or table.name != name:
+            flush()
+            table = db.metadata.tables[name]
+        batch.append({key: decode(table.columns[key], value) for key, value in row.items()})
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    reset_sequences()
+    return counts
+
+
+def reset_sequences():
+    """Move PostgreSQL primary key sequences past imported identifiers."""
+    if db.engine.dialect.name != "postgresql":
+        return
+    for name in TABLES:
+        table = db.metadata.tables[name]
+        for column in table.primary_key.columns:
+            if column.autoincrement is True or (column.autoincrement == "auto" and len(table.primary_key.columns) == 1):
+                db.session.execute(db.text(
+                    f"SELECT setval(pg_get_serial_sequence('{name}', '{column.name}'), "
+                    f"COALESCE(MAX({column.name}), 1)) FROM {name}"
+                ))
+    db.session.commit()
@@ -0,0 +1,106 @@
+import heapq
+import time
+from collections import Counter
+from threading import Lock
+
+from flask import current_app
+
+
+class Trending:
+    """Sliding-window message counters with periodically materialized top rooms.
+
+    Window is a ring of per-minute buckets. Every message increments its
+    minute bucket and running totals of the window, so recording is O(1).
+    Bucket which falls out of the window is subtracted from totals once.
+    Top TRENDING_SIZE rooms are recomputed from totals at most once per
+    TRENDING_INTERVAL seconds, so reading the list is O(K).
+    """
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register empty counters in application."""
+        window = app.config.get("TRENDING_WINDOW", 60)
+        app.extensions["trending"] = {
+            "window": window,
+            "size": app.config.get("TRENDING_SIZE", 10),
+            "interval": app.config.get("TRENDING_INTERVAL", 30),
+            "buckets": [Counter() for _ in range(window)],
+            "minutes": [None] * window,
+            "totals": Counter(),
+            "top": [],
+            "materialized_at": None,
+            "lock": Lock()
+        }
+
+    @property
+    def state(self):
+        return current_app.extensions["trending"]
+
+    @staticmethod
+    def _expire(state, slot, minute):
+        """Subtract bucket from window totals if it does not belong to given minute."""
+        if state["minutes"][slot] != minute:
+            bucket = state["buckets"][slot]
+            state["totals"].subtract(bucket)
+            for room_id in bucket:
+                if state["totals"][room_id] <= 0:
+                    del state["totals"][room_id]
+            bucket.clear()
+            state["minutes"][slot] = minute
+
+    def record(self, room_id, now=None):
+        """Count message sent to the room.
+
+        :param room_id: unique room identifier.
+        :param now: unix time of the message, current time by default.
+        """
+        state = self.state
+        minute = int((now or time.time()) // 60)
+        slot = minute % state["window"]
+        with state["lock"]:
+            self._expire(state, slot, minute)
+            state["buckets"][slot][room_id] += 1
+            state["totals"][room_id] += 1
+
+    def materialize(self, now=None):
+        """Drop buckets older than window and recompute top rooms.
+
+        :param now: unix time, current time by default.
+        """
+        state = self.state
+        now = now or time.time()
+        minute = int(now // 60)
+        with state["lock"]:
+            for slot, bucket_minute in enumerate(state["minutes"]):
+                if bucket_minute is not None and bucket_minute <= minute - state["window"]:
+                    self._expire(state, slot, None)
+            state["top"] = heapq.nlargest(state["size"], state["totals"].items(), key=lambda item: (item[1], item[0]))
+            state["materialized_at"] = now
+
+    def top(self, now=None):
+        """Return list of (room_id, messages in window) pairs, most active first.
+
+        :param now: unix time, current time by default.
+        """
+        state = self.state
+        now = now or time.time()
+        if state["materialized_at"] is None or now - state["materialized_at"] >= state["interval"]:
+            self.materialize(now)
+        return state["top"]
+
+    def forget(self, room_id):
+        """Remove deleted room from counters.
+
+        :param room_id: unique room identifier.
+        """
+        state = self.state
+        with state["lock"]:
+            for bucket in state["buckets"]:
+                bucket.pop(room_id, None)
+            state["totals"].pop(room_id, None)
+            state["top"] = [item for item in state["top"] if item[0] != room_id]
+
+
+trending = Trending()
@@ -5,7 +5,9 @@ from flask_login import current_user, login_required
 
 from . import users
 from .forms import EditProfileForm
+from ..conditional import conditional, newest, site_version
 from ..models import db, User, Room, Message
+from ..profiles import profiles
 
 
 @users.route("/users/<username>")
@@ -15,6 +17,11 @@ def user_page(username):
     :GET - return html page with specific user information.
     """
     user = User.query.filter_by(username=username).first_or_404()
+    rooms_updated_at = user.rooms.with_entities(sqla.func.max(Room.updated_at)).scalar()
+    response = conditional.not_modified(user.updated_at, rooms_updated_at, *site_version(),
+                                        last_modified=newest(user.updated_at, rooms_updated_at))
+    if response is not None:
+        return response
     rooms = user.rooms.order_by(Room.created_at.desc()).limit(5).all()
     return render_template("users/user_page.html", user=user, rooms=rooms)
 
@@ -33,6 +40,7 @@ def edit_user():
         current_user.about_me = form.about_me.data 
         db.session.add(current_user)
         db.session.commit()
+        profiles.refresh(current_user)
         flash(gettext("Profile info successfully updated."), "success")
         return redirect(url_for("users.user_page", username=current_user.username))
     form.name.data = current_user.name 
@@ -1,10 +1,11 @@
 from threading import Thread
 
-from flask import current_app, render_template
+from flask import current_app, get_flashed_messages, render_template, stream_template
 from flask_mail import Message
 
 from .extensions import mail
 from .models import db, Category
+from .profiles import profiles
 
 
 def async_send_mail(msg, app):
@@ -37,6 +38,54 @@ def send_mail(subject, to, template_name, **kwargs):
     return thr
 
 
+def buffered(chunks, size):
+    """Join small template chunks into pieces of at least size characters.
+    
+    :param chunks: iterable of rendered template chunks.
+    :param size: minimum piece size.
+    """
+    buffer, length = [], 0
+    try:
+        for chunk in chunks:
+            buffer.append(chunk)
+            length += len(chunk)
+            if length >= size:
+                yield "".join(buffer)
+                buffer, length = [], 0
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def stream_page(template_name, **context):
+    """Render template as streamed response, so page head is sent before heavy parts are rendered.
+    
+    :param template_name: name of template to render.
+    """
+    # Session is saved before body is generated, so flashed messages are popped beforehand.
+    get_flashed_messages()
+    chunks = stream_template(template_name, **context)
+    return current_app.response_class(buffered(chunks, current_app.config.get("STREAM_CHUNK_SIZE", 8192)))
+
+
+def message_to_json(message):
+    """Serialize message with sender data for socket events and json api.
+    
+    :param message: message object.
+    """
+    sender = profiles.display(message.sender_id)
+    return {
+        "id": message.message_id,
+        "msg": message.text,
+        "username": sender["username"],
+        "sent_at": str(message.sent_at),
+        "avatar": sender["avatars"][25],
+        "cursor": message.cursor
+    }
+
+
 def load_categories(categories=None):
     """Load basic categories to populate database.
     
@@ -1,5 +1,6 @@
 import os
 from dotenv import load_dotenv 
+from sqlalchemy.pool import QueuePool
 
 load_dotenv()
 # Base directory for local database.
@@ -21,6 +22,53 @@ class Config:
     # URL to database.
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", "").replace('postgres://', 'postgresql://') or \
         "sqlite:///" + os.path.join(base_dir, "database.sqlite")
+    
+    # Read replicas (comma separated urls). Plain reads are sent to replicas, everything else to primary.
+    SQLALCHEMY_BINDS = {
+        f"replica{i}": url.replace('postgres://', 'postgresql://')
+        for i, url in enumerate(filter(None, os.environ.get("DATABASE_REPLICA_URLS", "").split(",")))
+    }
+    SQLALCHEMY_REPLICA_BINDS = list(SQLALCHEMY_BINDS)
+    
+    # Seconds user reads stay on primary after the user changed something.
+    REPLICA_STICKY_SECONDS = float(os.environ.get("REPLICA_STICKY_SECONDS", 5))
+    
+    # Named database engine profiles: engine options and per-connection SQLite PRAGMAs.
+    # Profile matching database backend ("sqlite", "postgresql") is used if ENGINE_PROFILE is not set.
+    ENGINE_PROFILE = os.environ.get("ENGINE_PROFILE")
+    ENGINE_PROFILES = {
+        "default": {},
+        "sqlite": {
+            "engine": {
+                "poolclass": QueuePool,
+                "pool_size": 5,
+                "max_overflow": 10,
+                "connect_args": {"check_same_thread": False}
+            },
+            "pragmas": {
+                "journal_mode": "WAL",
+                "synchronous": "NORMAL",
+                "busy_timeout": int(os.environ.get("DATABASE_BUSY_TIMEOUT", 5000)),
+                "mmap_size": 256 * 1024 * 1024,
+                "cache_size": -16000,
+                "foreign_keys": "ON"
+            }
+        },
+        # Sized for one gevent worker where every greenlet may hold a connection.
+        "postgresql": {
+            "engine": {
+                "pool_size": int(os.environ.get("DATABASE_POOL_SIZE", 20)),
+                "max_overflow": int(os.environ.get("DATABASE_MAX_OVERFLOW", 30)),
+                "pool_timeout": 10,
+                "pool_recycle": 1800,
+                "pool_pre_ping": True,
+                "query_cache_size": 1200,
+                "connect_args": {
+                    "options": f"-c statement_timeout={int(os.environ.get('DATABASE_STATEMENT_TIMEOUT', 5000))}"
+                }
+            }
+        }
+    }
         
     # Mail system settings.
     MAIL_SERVER = os.environ.get("MAIL_SERVER")
@@ -37,10 +85,67 @@ class Config:
     # Pagination setting.
     CATEGORIES_AT_SIDEBAR = os.environ.get("CATEGORIES_AT_SIDEBAR", 5)
     ROOMS_PER_PAGE = os.environ.get("ROOMS_PER_PAGE", 5)
+    PARTICIPANTS_PER_PAGE = int(os.environ.get("PARTICIPANTS_PER_PAGE", 20))
+    MESSAGES_PER_PAGE = int(os.environ.get("MESSAGES_PER_PAGE", 20))
     
     # Maximum messages per chat.
     MAX_MESSAGES_AVAILABLE = os.environ.get("MAX_MESSAGES_AVAILABLE", 20)
     
+    # Maximum messages kept rendered in room page, older ones are reloaded on scroll.
+    ROOM_MESSAGES_WINDOW = int(os.environ.get("ROOM_MESSAGES_WINDOW", 200))
+    
+    # Minimum number of messages moved to archive at once.
+    ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", 50))
+    
+    # Durable message log. Messages are written to database synchronously if not set.
+    MESSAGE_LOG_DIR = os.environ.get("MESSAGE_LOG_DIR")
+    MESSAGE_LOG_SEGMENT_SIZE = int(os.environ.get("MESSAGE_LOG_SEGMENT_SIZE", 64 * 1024 * 1024))
+    MESSAGE_LOG_FSYNC_DELAY = float(os.environ.get("MESSAGE_LOG_FSYNC_DELAY", 0))
+    MESSAGE_LOG_BATCH_SIZE = int(os.environ.get("MESSAGE_LOG_BATCH_SIZE", 100))
+    MESSAGE_LOG_RETRIES = int(os.environ.get("MESSAGE_LOG_RETRIES", 3))
+    
+    # Maximum user render profiles kept in memory.
+    PROFILE_CACHE_SIZE = int(os.environ.get("PROFILE_CACHE_SIZE", 1024))
+    
+    # Seconds categories registry is kept before it is reloaded.
+    CATEGORY_CACHE_TTL = int(os.environ.get("CATEGORY_CACHE_TTL", 60))
+    
+    # Trending rooms: window in minutes, number of rooms and seconds between recomputations.
+    TRENDING_WINDOW = int(os.environ.get("TRENDING_WINDOW", 60))
+    TRENDING_SIZE = int(os.environ.get("TRENDING_SIZE", 10))
+    TRENDING_INTERVAL = int(os.environ.get("TRENDING_INTERVAL", 30))
+    
+    # Maximum number of rooms suggested while typing search query and seconds between index reloads.
+    AUTOCOMPLETE_LIMIT = int(os.environ.get("AUTOCOMPLETE_LIMIT", 10))
+    AUTOCOMPLETE_TTL = int(os.environ.get("AUTOCOMPLETE_TTL", 60))
+    
+    # Search results cache: maximum cached pages and counts, seconds entries stay fresh.
+    SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", 256))
+    SEARCH_CACHE_TTL = int(os.environ.get("SEARCH_CACHE_TTL", 30))
+    
+    # Rendered fragments cache: "memory", "filesystem" or empty to disable.
+    FRAGMENT_CACHE_BACKEND = os.environ.get("FRAGMENT_CACHE_BACKEND", "memory")
+    FRAGMENT_CACHE_SIZE = int(os.environ.get("FRAGMENT_CACHE_SIZE", 1024))
+    FRAGMENT_CACHE_DIR = os.environ.get("FRAGMENT_CACHE_DIR")
+    
+    # Message rate limits (messages per second and burst size).
+    RATELIMIT_BACKEND = os.environ.get("RATELIMIT_BACKEND", "memory")
+    USER_MESSAGE_RATE = float(os.environ.get("USER_MESSAGE_RATE", 1))
+    USER_MESSAGE_BURST = int(os.environ.get("USER_MESSAGE_BURST", 5))
+    ROOM_MESSAGE_RATE = float(os.environ.get("ROOM_MESSAGE_RATE", 20))
+    ROOM_MESSAGE_BURST = int(os.environ.get("ROOM_MESSAGE_BURST", 50))
+    
+    # Gzip compression of dynamic responses: level (0 disables) and minimum body size in bytes.
+    COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", 6))
+    COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 500))
+    
+    # Minimum size of chunks sent by streamed pages.
+    STREAM_CHUNK_SIZE = int(os.environ.get("STREAM_CHUNK_SIZE", 8192))
+    
+    # Fingerprinted static files produced by "flask assets build" and their browser cache lifetime.
+    ASSETS_BUILD_DIR = os.environ.get("ASSETS_BUILD_DIR") or os.path.join(base_dir, "chat", "static", "build")
+    ASSETS_MAX_AGE = int(os.environ.get("ASSETS_MAX_AGE", 365 * 24 * 60 * 60))
+    
     # Application languages available
     LANGUAGES_LIST = {
         "en": "ENG",
@@ -48,6 +153,9 @@ class Config:
         "uk": "УКР"
     }
     
+    # Maximum Accept-Language header values with resolved locale kept in memory.
+    LOCALE_CACHE_SIZE = int(os.environ.get("LOCALE_CACHE_SIZE", 256))
+    
     
 class TestConfig:
     """Application test config class."""
@@ -62,7 +170,16 @@ class TestConfig:
         "sqlite:///" + os.path.join(base_dir, "testdb.sqlite") 
     
     # Pagination setting. 
+    CATEGORIES_AT_SIDEBAR = os.environ.get("CATEGORIES_AT_SIDEBAR", 5)
     ROOMS_PER_PAGE = os.environ.get("ROOMS_PER_PAGE", 5)
+    PARTICIPANTS_PER_PAGE = int(os.environ.get("PARTICIPANTS_PER_PAGE", 20))
+    MESSAGES_PER_PAGE = int(os.environ.get("MESSAGES_PER_PAGE", 20))
     
     # Maximum messages per chat.
     MAX_MESSAGES_AVAILABLE = os.environ.get("MAX_MESSAGES_AVAILABLE", 20)
+    
+    # Archive every message over the limit immediately.
+    ARCHIVE_BATCH_SIZE = 1
+    
+    # Application languages available
+    LANGUAGES_LIST = Config.LANGUAGES_LIST
@@ -0,0 +1,41 @@
+"""Add ON DELETE CASCADE to foreign keys.
+
+Revision ID: c5d1a8e2f7b4
+Revises: 90c3f75386a0
+Create Date: 2026-10-19 14:45:12.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d1a8e2f7b4'
+down_revision = '90c3f75386a0'
+branch_labels = None
+depends_on = None
+
+# (table, column, referred table, referred column)
+foreign_keys = [
+    ('participants', 'room_id', 'rooms', 'room_id'),
+    ('participants', 'user_id', 'users', 'user_id'),
+    ('rooms', 'creator_id', 'users', 'user_id'),
+    ('rooms', 'category_id', 'categories', 'category_id'),
+    ('messages', 'sender_id', 'users', 'user_id'),
+    ('messages', 'room_id', 'rooms', 'room_id'),
+    ('message_archives', 'room_id', 'rooms', 'room_id'),
+]
+
+
+def upgrade():
+    for table, column, referred_table, referred_column in foreign_keys:
+        name = f'{table}_{column}_fkey'
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referred_table, [column], [referred_column], ondelete='CASCADE')
+
+
+def downgrade():
+    for table, column, referred_table, referred_column in foreign_keys:
+        name = f'{table}_{column}_fkey'
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referred_table, [column], [referred_column])
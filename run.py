@@ -1,10 +1,28 @@
 import os
 import click
-from chat import create_app, sio
-from chat.utils import load_categories
-from chat.models import db, Room
+from chat import create_app
 
-app = create_app()
+# Flask commands which serve or inspect pages, other commands get application without blueprints.
+WEB_COMMANDS = {"run", "routes", "shell"}
+
+
+def cli_command():
+    """Return name of flask command loading the application, None outside of flask cli.
+    Commands defined below load application before they are resolved, empty string is returned for them.
+    """
+    ctx = click.get_current_context(silent=True)
+    if ctx is None:
+        return None
+    root = ctx.find_root()
+    if ctx is root:
+        return ""
+    while ctx.parent is not root:
+        ctx = ctx.parent
+    return ctx.info_name
+
+
+command = cli_command()
+app = create_app(blueprints=command is None or command in WEB_COMMANDS, migrations=command is not None)
 
 
 @app.cli.group()
@@ -13,6 +31,16 @@ def translate():
     pass
     
     
+def pybabel(*args):
+    """Run pybabel command in-process.
+    
+    :param args: pybabel command line arguments.
+    """
+    from babel.messages.frontend import CommandLineInterface
+    if CommandLineInterface().run(["pybabel", *args]):
+        raise RuntimeError(f"{args[0].capitalize()} command failed.")
+    
+    
 @translate.command()
 @click.argument("lang")
 def init(lang):
@@ -20,30 +48,52 @@ def init(lang):
     
     :param lang: new app language.
     """
-    if os.system("pybabel extract -F babel.cfg -k _l -o messages.pot ."):
-        raise RuntimeError("Extract command failed.")
-    if os.system("pybabel init -i messages.pot -d chat/translations -l " + lang):
-        raise RuntimeError(f"Init {lang} language command failed.")
+    pybabel("extract", "-F", "babel.cfg", "-k", "_l", "-o", "messages.pot", ".")
+    pybabel("init", "-i", "messages.pot", "-d", "chat/translations", "-l", lang)
     os.remove("messages.pot")
     
     
 @translate.command()
 def update():
     """Flask-Babel command to update all languages."""
-    if os.system("pybabel extract -F babel.cfg -k _l -o messages.pot ."):
-        raise RuntimeError("Extract command failed.")
-    if os.system("pybabel update -i messages.pot -d chat/translations"):
-        raise RuntimeError("Update command failed.")
+    pybabel("extract", "-F", "babel.cfg", "-k", "_l", "-o", "messages.pot", ".")
+    pybabel("update", "-i", "messages.pot", "-d", "chat/translations")
     os.remove("messages.pot")
     
     
 @translate.command()
-def compile():
+@click.option("--force", is_flag=True, help="Compile catalogs which are up to date.")
+def compile(force):
     """Flask-Babel command to Compile all languages."""
-    if os.system("pybabel compile -d chat/translations"):
-        raise RuntimeError("Compile command failed.")
+    from chat.i18n import compile_catalogs
+    compiled = compile_catalogs(os.path.join(app.root_path, "translations"), force=force)
+    print(f"{len(compiled)} catalogs compiled.")
  
  
+@app.cli.group()
+def assets():
+    """Static assets cli commands."""
+    pass
+
+
+@assets.command()
+@click.option("--no-vendor", is_flag=True, help="Do not download third-party assets.")
+def build(no_vendor):
+    """Fingerprint and precompress static files, downloading third-party assets first."""
+    from chat.assets import assets
+    count, failed = assets.build(app, vendor=not no_vendor)
+    for filename in failed:
+        print(f"Failed to download {filename}, CDN url will be used.")
+    print(f"{count} static files built.")
+
+
+@assets.command()
+def clean():
+    """Remove built static files."""
+    from chat.assets import assets
+    assets.clean(app)
+    
+    
 @app.cli.command()
 @click.argument("test_names", nargs=-1)
 def test(test_names):
@@ -55,19 +105,87 @@ def test(test_names):
     unittest.TextTestRunner(verbosity=2).run(tests)
   
   
+@app.cli.command()
+def startup():
+    """Print time spent in every startup step of web application."""
+    report = create_app(migrations=False).extensions["startup"]
+    for step, seconds in report:
+        print(f"{step:<12} {seconds * 1000:8.1f} ms")
+    print(f"{'total':<12} {sum(seconds for _, seconds in report) * 1000:8.1f} ms")
+    
+    
 @app.cli.command()
 @click.argument("categories", nargs=-1)
 def insert_categories(categories):
+    from chat.utils import load_categories
     load_categories(categories)
     
     
+@app.cli.command("export")
+@click.argument("path")
+@click.option("--format", "fmt", type=click.Choice(["jsonl", "csv"]), default="jsonl")
+@click.option("--batch-size", default=1000)
+def export_data(path, fmt, batch_size):
+    """Export users, categories, rooms, participants and messages.
+    
+    :param path: jsonl file or directory for csv files.
+    """
+    from chat.transfer import export_data
+    for table, count in export_data(path, fmt, batch_size).items():
+        print(f"{count} {table} exported.")
+        
+        
+@app.cli.command("import")
+@click.argument("path")
+@click.option("--format", "fmt", type=click.Choice(["jsonl", "csv"]), default="jsonl")
+@click.option("--batch-size", default=1000)
+def import_data(path, fmt, batch_size):
+    """Import data produced by export command.
+    
+    :param path: jsonl file or directory with csv files.
+    """
+    from chat.transfer import import_data
+    for table, count in import_data(path, fmt, batch_size).items():
+        print(f"{count} {table} imported.")
+    
+    
+@app.cli.command()
+@click.option("--batch-size", default=1000)
+def reindex_messages(batch_size):
+    """Rebuild message search index."""
+    from chat.models import MessageTerm
+    print(f"{MessageTerm.rebuild(batch_size)} messages indexed.")
+    
+    
+@app.cli.command()
+def replay_messages():
+    """Materialize messages from durable message log after crash."""
+    from chat.msglog import msglog
+    if not msglog.enabled:
+        raise click.ClickException("MESSAGE_LOG_DIR is not configured.")
+    print(f"{msglog.replay()} messages replayed.")
+    
+    
 @app.cli.command()
 @click.argument("room_id", nargs=1)
-def drop_room(room_id):
+@click.option("--chunk-size", type=int, help="Delete dependent rows in chunks of given size.")
+def drop_room(room_id, chunk_size):
+    from chat.deletion import delete_room
+    from chat.models import Room
     room = Room.query.get(room_id)
     if room is not None:
-        db.session.delete(room)
-        db.session.commit()
+        delete_room(room.room_id, chunk_size)
+        
+        
+@app.cli.command()
+@click.argument("username", nargs=1)
+@click.option("--chunk-size", type=int, help="Delete dependent rows in chunks of given size.")
+def drop_user(username, chunk_size):
+    from chat.deletion import delete_user
+    from chat.models import User
+    user = User.query.filter_by(username=username).first()
+    if user is not None:
+        delete_user(user.user_id, chunk_size)
     
     
 if __name__ == "__main__":
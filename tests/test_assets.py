@@ -0,0 +1,53 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from flask import url_for
+
+from chat import create_app
+from chat.assets import assets
+from config import TestConfig
+
+
+class AssetsTestCase(unittest.TestCase):
+    config = TestConfig
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.app = create_app(self.config)
+        self.app.config["ASSETS_BUILD_DIR"] = self.tmp.name
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        self.client = self.app.test_client()
+        
+    def test_build_and_serve(self):
+        with self.app.test_request_context():
+            self.assertEqual(url_for("static", filename="css/styles.css"), "/static/css/styles.css")
+            self.assertTrue(assets.vendor("vendor/socket.io.min.js").startswith("https://"))
+        count, failed = assets.build(self.app, vendor=False)
+        self.assertTrue(count >= 4)
+        with self.app.test_request_context():
+            url = url_for("static", filename="css/styles.css")
+        self.assertRegex(url, r"^/static/css/styles\.[0-9a-f]{12}\.css$")
+        
+        response = self.client.get(url, headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(response.mimetype, "text/css")
+        self.assertTrue("immutable" in response.headers["Cache-Control"])
+        with open(os.path.join(self.app.static_folder, "css", "styles.css"), "rb") as f:
+            self.assertEqual(gzip.decompress(response.data), f.read())
+        response.close()
+        
+        response = self.client.get(url)
+        self.assertTrue(response.headers.get("Content-Encoding") is None)
+        response.close()
+        
+        response = self.client.get("/static/css/styles.css")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue("immutable" not in response.headers.get("Cache-Control", ""))
+        response.close()
+        
+    def tearDown(self):
+        self.app_ctx.pop()
+        self.tmp.cleanup()
@@ -0,0 +1,77 @@
+import unittest
+from unittest.mock import patch
+
+from chat import create_app
+from chat.deletion import cascade_supported, delete_room, delete_user
+from chat.models import db, participants, User, Room, Category, Message, MessageArchive
+from config import TestConfig
+
+
+class DeletionTestCase(unittest.TestCase):
+    config = TestConfig
+    
+    def setUp(self):
+        self.app = create_app(self.config)
+        self.app.config["MAX_MESSAGES_AVAILABLE"] = 5
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        
+        self.bob = User(username="bob", email="bob@test.com")
+        self.alice = User(username="alice", email="alice@test.com")
+        c = Category(name="Python")
+        self.room = Room(name="Let's learn Flask!", creator=self.bob, category=c)
+        self.other = Room(name="Django", creator=self.alice, category=c)
+        for room in (self.room, self.other):
+            room.users.append(self.bob)
+            room.users.append(self.alice)
+        db.session.add_all([self.room, self.other])
+        db.session.commit()
+        for i in range(10):
+            for room in (self.room, self.other):
+                db.session.add(Message(text=f"message {i}", sender=self.bob if i % 2 else self.alice, room=room))
+                room.clean()
+                db.session.commit()
+        
+    def test_delete_room(self):
+        room_id = self.room.room_id
+        delete_room(room_id)
+        self.assertTrue(Room.query.get(room_id) is None)
+        self.assertEqual(Message.query.filter_by(room_id=room_id).count(), 0)
+        self.assertEqual(MessageArchive.query.filter_by(room_id=room_id).count(), 0)
+        self.assertEqual(db.session.query(participants).filter_by(room_id=room_id).count(), 0)
+        self.assertEqual(Message.query.filter_by(room_id=self.other.room_id).count(), 5)
+        
+    def test_delete_room_chunked(self):
+        room_id = self.room.room_id
+        delete_room(room_id, chunk_size=2)
+        self.assertTrue(Room.query.get(room_id) is None)
+        self.assertEqual(Message.query.filter_by(room_id=room_id).count(), 0)
+        
+    def test_delete_user(self):
+        user_id, room_id = self.bob.user_id, self.room.room_id
+        delete_user(user_id, chunk_size=2)
+        self.assertTrue(User.query.get(user_id) is None)
+        self.assertTrue(Room.query.get(room_id) is None)
+        self.assertEqual(Message.query.filter_by(sender_id=user_id).count(), 0)
+        self.assertEqual(Message.query.filter_by(room_id=self.other.room_id).count(), 2)
+        self.assertEqual(self.other.users.count(), 1)
+        
+    def test_delete_user_touches_joined_rooms(self):
+        updated_at = self.other.updated_at
+        delete_user(self.bob.user_id)
+        db.session.expire_all()
+        self.assertTrue(Room.query.get(self.other.room_id).updated_at > updated_at)
+        
+    def test_cascade_supported(self):
+        self.assertFalse(cascade_supported())
+        db.session.execute(db.text("PRAGMA foreign_keys=ON"))
+        self.assertTrue(cascade_supported())
+        # Schema created before cascades were added to migrations.
+        with patch("chat.deletion.inspect") as inspect:
+            inspect.return_value.get_foreign_keys.return_value = [{"referred_table": "rooms", "options": {}}]
+            self.assertFalse(cascade_supported())
+        
+    def tearDown(self):
+        db.drop_all()
+        self.app_ctx.pop()
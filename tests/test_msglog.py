@@ -0,0 +1,131 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from chat import create_app
+from chat.models import db, User, Room, Category, Message, MessageTerm
+from chat.msglog import msglog, SegmentLog
+from config import TestConfig
+
+
+class MessageLogTestCase(unittest.TestCase):
+    config = TestConfig
+    
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.app = create_app(self.config)
+        self.app.config["MESSAGE_LOG_DIR"] = self.path
+        msglog.init_app(self.app)
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        
+    def test_log_append_and_read(self):
+        log = SegmentLog(os.path.join(self.path, "log"), segment_size=64)
+        seqs = [log.append({"n": i}) for i in range(5)]
+        self.assertEqual(seqs, [1, 2, 3, 4, 5])
+        self.assertTrue(len(log.segments()) > 1)
+        self.assertEqual([r["n"] for _, r in log.read(after=2)], [2, 3, 4])
+        
+    def test_log_truncates_torn_record(self):
+        path = os.path.join(self.path, "log")
+        log = SegmentLog(path)
+        log.append({"n": 0})
+        log.append({"n": 1})
+        log.close()
+        with open(log.segments()[-1][1], "ab") as f:
+            f.write(b"\x03\x00\x00")
+        
+        log = SegmentLog(path)
+        self.assertEqual(log.append({"n": 2}), 3)
+        self.assertEqual([r["n"] for _, r in log.read()], [0, 1, 2])
+        
+    def test_replay(self):
+        u = User(username="bob", email="bob@test.com")
+        r = Room(name="Let's learn Flask!", creator=u, category=Category(name="Python"))
+        db.session.add(r)
+        db.session.commit()
+        
+        log = msglog.state["log"]
+        for i in range(3):
+            log.append({"room_id": r.room_id, "sender_id": u.user_id, 
+                        "text": f"message {i}", "sent_at": "2022-09-01T10:00:00"})
+        log.append({"room_id": 12345, "sender_id": u.user_id, 
+                    "text": "deleted room", "sent_at": "2022-09-01T10:00:00"})
+        
+        self.assertEqual(msglog.replay(), 4)
+        self.assertEqual(Message.query.filter_by(room_id=r.room_id).count(), 3)
+        self.assertEqual(MessageTerm.search("message", r.room_id).count(), 3)
+        self.assertEqual(log.read_checkpoint(), 4)
+        self.assertEqual(msglog.replay(), 0)
+        
+    def test_recover_after_restart(self):
+        u = User(username="bob", email="bob@test.com")
+        r = Room(name="Let's learn Flask!", creator=u, category=Category(name="Python"))
+        db.session.add(r)
+        db.session.commit()
+        for i in range(3):
+            msglog.state["log"].append({"room_id": r.room_id, "sender_id": u.user_id, 
+                                        "text": f"message {i}", "sent_at": "2022-09-01T10:00:00"})
+        msglog.state["log"].close()
+        
+        # Restarted process materializes records of previous one before new ones.
+        msglog.init_app(self.app)
+        log = msglog.state["log"]
+        seq = log.append({"room_id": r.room_id, "sender_id": u.user_id, 
+                          "text": "new", "sent_at": "2022-09-01T10:01:00"})
+        with self.assertRaises(RuntimeError):
+            msglog.materialize([(seq, {})])
+        self.assertEqual(msglog.recover(), 4)
+        self.assertEqual(Message.query.filter_by(room_id=r.room_id).count(), 4)
+        self.assertEqual(log.read_checkpoint(), 4)
+        
+    def test_materializer_survives_failure(self):
+        u = User(username="bob", email="bob@test.com")
+        r = Room(name="Let's learn Flask!", creator=u, category=Category(name="Python"))
+        db.session.add(r)
+        db.session.commit()
+        materialize_reliably, calls = msglog.materialize_reliably, []
+        
+        def fail_once(records):
+            calls.append(records)
+            if len(calls) == 1:
+                raise RuntimeError("Materialization failed.")
+            materialize_reliably(records)
+        
+        with mock.patch.object(msglog, "materialize_reliably", fail_once):
+            msglog.append(r.room_id, u.user_id, "first")
+            self.wait_for_checkpoint(1)
+            msglog.append(r.room_id, u.user_id, "second")
+            self.wait_for_checkpoint(2)
+        self.assertEqual([m.text for m in Message.query.order_by(Message.message_id)], ["first", "second"])
+        
+    def wait_for_checkpoint(self, seq, timeout=10):
+        deadline = time.monotonic() + timeout
+        while msglog.state["log"].read_checkpoint() < seq:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+        
+    def test_dead_letter(self):
+        self.app.config["MESSAGE_LOG_RETRIES"] = 1
+        u = User(username="bob", email="bob@test.com")
+        r = Room(name="Let's learn Flask!", creator=u, category=Category(name="Python"))
+        db.session.add(r)
+        db.session.commit()
+        records = [(i + 1, {"room_id": r.room_id, "sender_id": u.user_id, "text": f"message {i}",
+                            "sent_at": "broken" if i == 1 else "2022-09-01T10:00:00"}) for i in range(3)]
+        
+        msglog.materialize_reliably(records)
+        self.assertEqual([m.text for m in Message.query.order_by(Message.message_id)], ["message 0", "message 2"])
+        self.assertEqual(msglog.state["log"].read_checkpoint(), 3)
+        with open(os.path.join(self.path, "dead-letter.jsonl")) as f:
+            self.assertEqual(json.loads(f.read())["seq"], 2)
+        
+    def tearDown(self):
+        db.drop_all()
+        self.app_ctx.pop()
+        shutil.rmtree(self.path)
@@ -0,0 +1,262 @@
+import gzip
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy.orm import Query
+
+from chat import create_app
+from chat.fragments import fragments
+from chat.models import db, User, Room, Category, Message, MessageArchive, MessageTerm
+from chat.search import search_cache
+from chat.trending import trending
+from config import TestConfig
+
+
+class RoomsTestCase(unittest.TestCase):
+    config = TestConfig
+    
+    def setUp(self):
+        self.app = create_app(self.config)
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        
+    def test_room_participants_pages(self):
+        self.app.config["PARTICIPANTS_PER_PAGE"] = 2
+        c = Category(name="Python")
+        users = [User(username=f"user{i}", email=f"user{i}@test.com") for i in range(3)]
+        r = Room(name="Let's learn Flask!", creator=users[0], category=c)
+        for u in users:
+            r.users.append(u)
+        db.session.add(r)
+        db.session.commit()
+        
+        data = self.client.get(f"/rooms/{r.room_id}/participants").get_json()
+        self.assertEqual(data["total"], 3)
+        self.assertEqual(len(data["participants"]), 2)
+        self.assertEqual(data["next"], 2)
+        
+        data = self.client.get(f"/rooms/{r.room_id}/participants?page=2").get_json()
+        self.assertEqual([p["username"] for p in data["participants"]], ["user2"])
+        self.assertTrue(data["next"] is None)
+        
+    def test_room_messages_keyset_pages(self):
+        self.app.config["MESSAGES_PER_PAGE"] = 2
+        u = User(username="bob", email="bob@test.com")
+        r = Room(name="Let's learn Flask!", creator=u, category=Category(name="Python"))
+        db.session.add(r)
+        db.session.commit()
+        for i in range(5):
+            db.session.add(Message(text=f"message {i}", sender=u, room=r))
+            db.session.commit()
+        
+        data = self.client.get(f"/rooms/{r.room_id}/messages").get_json()
+        self.assertEqual([m["msg"] for m in data["messages"]], ["message 3", "message 4"])
+        self.assertEqual(data["messages"][0]["username"], "bob")
+        
+        data = self.client.get(f"/rooms/{r.room_id}/messages", query_string={"before": data["before"]}).get_json()
+        self.assertEqual([m["msg"] for m in data["messages"]], ["message 1", "message 2"])
+        
+        data = self.client.get(f"/rooms/{r.room_id}/messages", query_string={"after": data["after"]}).get_json()
+        self.assertEqual([m["msg"] for m in data["messages"]], ["message 3", "message 4"])
+        
+        response = self.client.get(f"/rooms/{r.room_id}/messages?before=invalid")
+        self.assertEqual(response.status_code, 400)
+        
+    def test_room_messages_from_archive(self):
+        self.app.config["MESSAGES_PER_PAGE"] = 3
+        self.app.config["MAX_MESSAGES_AVAILABLE"] = 2
+        self.app.config["ARCHIVE_BATCH_SIZE"] = 2
+        u = User(username="bob", email="bob@test.com")
+        r = Room(name="Let's learn Flask!", creator=u, category=Category(name="Python"))
+        db.session.add(r)
+        db.session.commit()
+        for i in range(7):
+            db.session.add(Message(text=f"message {i}", sender=u, room=r))
+            r.clean()
+            db.session.commit()
+        self.assertEqual(r.messages.count(), 3)
+        self.assertEqual(MessageArchive.query.count(), 2)
+        
+        data = self.client.get(f"/rooms/{r.room_id}/messages").get_json()
+        self.assertEqual([m["msg"] for m in data["messages"]], ["message 4", "message 5", "message 6"])
+        
+        data = self.client.get(f"/rooms/{r.room_id}/messages", query_string={"before": data["before"]}).get_json()
+        self.assertEqual([m["msg"] for m in data["messages"]], ["message 1", "message 2", "message 3"])
+        
+        before = data["before"]
+        data = self.client.get(f"/rooms/{r.room_id}/messages", query_string={"before": before}).get_json()
+        self.assertEqual([m["msg"] for m in data["messages"]], ["message 0"])
+        
+        data = self.client.get(f"/rooms/{r.room_id}/messages", query_string={"after": before}).get_json()
+        self.assertEqual([m["msg"] for m in data["messages"]], ["message 2", "message 3", "message 4"])
+        
+    def test_room_fragments_cache(self):
+        self.app.config["WTF_CSRF_ENABLED"] = False
+        c = Category(name="Python")
+        u = User(username="bob", email="bob@test.com", password="dog", confirmed=True)
+        r = Room(name="Let's learn Flask!", creator=u, category=c)
+        r.users.append(u)
+        db.session.add_all([r, User(username="alice", email="alice@test.com", password="cat", confirmed=True)])
+        db.session.commit()
+        
+        self.assertTrue("1 room participant(s)" in self.client.get("/").get_data(as_text=True))
+        self.assertTrue(fragments.backend.get(f"room:{r.room_id}"))
+        
+        self.client.post("/auth/login", data={"username": "alice", "password": "cat"})
+        self.client.get(f"/rooms/{r.room_id}/join")
+        self.assertTrue(fragments.backend.get(f"room:{r.room_id}") is None)
+        self.assertTrue("2 room participant(s)" in self.client.get("/").get_data(as_text=True))
+
+    def test_room_conditional_get(self):
+        u = User(username="bob", email="bob@test.com")
+        r = Room(name="Let's learn Flask!", creator=u, category=Category(name="Python"))
+        db.session.add(r)
+        db.session.commit()
+
+        response = self.client.get(f"/rooms/{r.room_id}")
+        etag = response.headers["ETag"]
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers.get("Last-Modified"))
+        self.assertEqual(self.client.get(f"/rooms/{r.room_id}", headers={"If-None-Match": etag}).status_code, 304)
+
+        db.session.add(Message(text="hello", sender=u, room=r))
+        db.session.commit()
+        response = self.client.get(f"/rooms/{r.room_id}", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+        etag = self.client.get("/").headers["ETag"]
+        self.assertEqual(self.client.get("/", headers={"If-None-Match": etag}).status_code, 304)
+        db.session.add(Room(name="Flask 2", creator=u))
+        db.session.commit()
+        self.assertEqual(self.client.get("/", headers={"If-None-Match": etag}).status_code, 200)
+
+        etag = self.client.get("/users/bob").headers["ETag"]
+        self.assertEqual(self.client.get("/users/bob", headers={"If-None-Match": etag}).status_code, 304)
+
+    def test_response_compression(self):
+        u = User(username="bob", email="bob@test.com")
+        r = Room(name="Let's learn Flask!", creator=u, category=Category(name="Python"))
+        db.session.add(r)
+        db.session.commit()
+        
+        plain = self.client.get(f"/rooms/{r.room_id}")
+        self.assertTrue(plain.headers.get("Content-Encoding") is None)
+        self.assertTrue("Accept-Encoding" in plain.headers["Vary"])
+        
+        response = self.client.get(f"/rooms/{r.room_id}", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.data), plain.data)
+        self.assertTrue(response.headers["ETag"].startswith("W/"))
+        response = self.client.get(f"/rooms/{r.room_id}", headers={"If-None-Match": response.headers["ETag"]})
+        self.assertEqual(response.status_code, 304)
+        
+        response = self.client.get(f"/rooms/{r.room_id}/participants", headers={"Accept-Encoding": "gzip"})
+        self.assertTrue(response.headers.get("Content-Encoding") is None)
+        
+    def test_streamed_response_compression(self):
+        @self.app.route("/stream")
+        def stream():
+            return self.app.response_class((f"<p>{i}</p>" for i in range(100)), mimetype="text/html")
+        
+        response = self.client.get("/stream", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.data).decode(), "".join(f"<p>{i}</p>" for i in range(100)))
+        
+    def test_room_page_streamed(self):
+        self.app.config["WTF_CSRF_ENABLED"] = False
+        self.app.config["STREAM_CHUNK_SIZE"] = 1024
+        u = User(username="bob", email="bob@test.com", password="dog", confirmed=True)
+        r = Room(name="Let's learn Flask!", creator=u, category=Category(name="Python"))
+        db.session.add(r)
+        db.session.commit()
+        
+        self.client.post("/auth/login", data={"username": "bob", "password": "dog"})
+        response = self.client.get(f"/rooms/{r.room_id}/join", follow_redirects=True)
+        self.assertTrue(response.is_streamed)
+        self.assertTrue("You have joined" in response.get_data(as_text=True))
+        self.assertTrue("Send message" in response.get_data(as_text=True))
+        response = self.client.get(f"/rooms/{r.room_id}")
+        self.assertTrue("You have joined" not in response.get_data(as_text=True))
+        
+    def test_trending_rooms_page(self):
+        c = Category(name="Python")
+        quiet, busy = Room(name="Quiet room", category=c), Room(name="Busy room", category=c)
+        db.session.add_all([quiet, busy])
+        db.session.commit()
+        trending.record(quiet.room_id)
+        for _ in range(3):
+            trending.record(busy.room_id)
+        
+        data = self.client.get("/trending").get_data(as_text=True)
+        self.assertTrue(data.index("Busy room") < data.index("Quiet room"))
+        
+    def test_search_autocomplete(self):
+        c = Category(name="Python")
+        db.session.add_all([Room(name="Learn Flask", category=c), Room(name="Django", category=c)])
+        db.session.commit()
+        
+        data = self.client.get("/search/autocomplete?q=fl").get_json()
+        self.assertEqual([room["name"] for room in data["rooms"]], ["Learn Flask"])
+        self.assertEqual(self.client.get("/search/autocomplete").get_json(), {"rooms": []})
+        
+    def test_search_cached(self):
+        self.app.config["ROOMS_PER_PAGE"] = 2
+        c = Category(name="Python")
+        db.session.add_all([Room(name=f"Flask {i}", category=c) for i in range(3)])
+        db.session.commit()
+        
+        data = self.client.get("/search?q=flask").get_data(as_text=True)
+        self.assertTrue("Flask 2" in data and "Flask 1" in data and "Flask 0" not in data)
+        self.assertIn("/search?page=2&amp;q=flask", data)
+        self.assertIn("Flask 0", self.client.get("/search?q=++flask&page=2").get_data(as_text=True))
+        self.assertEqual(self.client.get("/search?q=flask&page=3").status_code, 404)
+        # Cached count is reused while pages are still loaded.
+        self.assertEqual(search_cache.state["counts"].get("flask")[1], 3)
+        with patch.object(Query, "count", side_effect=AssertionError):
+            self.assertEqual(self.client.get("/search?q=flask").status_code, 200)
+        # Created room drops cached results.
+        db.session.add(Room(name="Flask 3", category=c))
+        db.session.commit()
+        self.assertIn("Flask 3", self.client.get("/search?q=flask").get_data(as_text=True))
+        
+    def test_search_messages(self):
+        self.app.config["WTF_CSRF_ENABLED"] = False
+        self.app.config["MAX_MESSAGES_AVAILABLE"] = 3
+        u = User(username="bob", email="bob@test.com", password="dog", confirmed=True)
+        flask, django = Room(name="Flask", creator=u), Room(name="Django", creator=u)
+        flask.users.append(u)
+        db.session.add_all([flask, django])
+        db.session.commit()
+        texts = ["old flask question", "Flask blueprints", "blueprints in flask, flask app factory", "unrelated"]
+        for text in texts:
+            message = Message(text=text, sender=u, room=flask)
+            db.session.add(message)
+            db.session.flush()
+            MessageTerm.index([message])
+            flask.clean()
+            db.session.commit()
+        message = Message(text="flask vs django", sender=u, room=django)
+        db.session.add(message)
+        db.session.flush()
+        MessageTerm.index([message])
+        db.session.commit()
+        
+        # First message was archived and removed from index.
+        data = self.client.get("/messages/search", query_string={"q": "Flask blueprints", "room_id": flask.room_id}).get_json()
+        self.assertEqual([m["msg"] for m in data["messages"]], ["blueprints in flask, flask app factory", "Flask blueprints"])
+        self.assertEqual(data["total"], 2)
+        data = self.client.get("/messages/search", query_string={"q": "django", "room_id": flask.room_id}).get_json()
+        self.assertEqual(data["messages"], [])
+        
+        self.assertEqual(self.client.get("/messages/search?q=flask").status_code, 401)
+        self.client.post("/auth/login", data={"username": "bob", "password": "dog"})
+        data = self.client.get("/messages/search?q=flask").get_json()
+        self.assertEqual(data["total"], 2)
+        self.assertTrue(all(m["room_id"] == flask.room_id for m in data["messages"]))
+        
+    def tearDown(self):
+        db.drop_all()
+        self.app_ctx.pop()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+from chat import create_app
+from chat.models import db, User, Room, Category
+from chat.routing import STICKY_KEY
+from config import TestConfig
+
+
+class RoutingTestCase(unittest.TestCase):
+    config = TestConfig
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.app = create_app(self.config)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(self.tmp.name, "primary.sqlite")
+        self.app.config["SQLALCHEMY_BINDS"] = {"replica0": "sqlite:///" + os.path.join(self.tmp.name, "replica.sqlite")}
+        self.app.config["SQLALCHEMY_REPLICA_BINDS"] = ["replica0"]
+        self.app.config["WTF_CSRF_ENABLED"] = False
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        db.metadata.create_all(db.get_engine(self.app, bind="replica0"))
+        
+    def test_reads_go_to_replica(self):
+        db.session.add(Room(name="Let's learn Flask!", category=Category(name="Python")))
+        db.session.commit()
+        # Session which wrote reads its own writes from primary.
+        self.assertEqual(Room.query.count(), 1)
+        db.session.remove()
+        # Outside of request reads go to primary.
+        self.assertEqual(Room.query.count(), 1)
+        db.session.remove()
+        # Fresh session of request reads from replica which has not received the room.
+        with self.app.test_request_context():
+            self.assertEqual(Room.query.count(), 0)
+            self.assertEqual(db.session.query(Room).with_for_update().count(), 1)
+        
+    def test_reads_stick_to_primary_after_write(self):
+        u = User(username="bob", email="bob@test.com", password="dog", confirmed=True)
+        db.session.add_all([u, Category(name="Python")])
+        db.session.commit()
+        self.replicate(User, Category)
+        # Requests run in their own application context, so every request gets fresh session.
+        self.app_ctx.pop()
+        try:
+            client = self.app.test_client()
+            client.post("/auth/login", data={"username": "bob", "password": "dog"})
+            with client.session_transaction() as session:
+                self.assertTrue(STICKY_KEY not in session)
+            
+            client.post("/rooms/create", data={"name": "Flask", "description": "About Flask", "category": 1})
+            with client.session_transaction() as session:
+                self.assertTrue(STICKY_KEY in session)
+            with self.app.test_request_context():
+                self.assertEqual(Room.query.count(), 0)
+            self.assertTrue("Flask" in client.get("/users/bob").get_data(as_text=True))
+        finally:
+            self.app_ctx.push()
+        
+    def replicate(self, *models):
+        """Copy rows of models from primary to replica."""
+        replica = db.get_engine(self.app, bind="replica0")
+        for model in models:
+            rows = db.session.execute(model.__table__.select()).mappings().all()
+            db.session.execute(model.__table__.insert(), [dict(row) for row in rows], bind_arguments={"bind": replica})
+        db.session.commit()
+        db.session.remove()
+        
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_ctx.pop()
+        self.tmp.cleanup()
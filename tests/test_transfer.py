@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from chat import create_app
+from chat.models import db, User, Room, Category, Message, MessageArchive
+from chat.transfer import export_data, import_data
+from config import TestConfig
+
+
+class TransferTestCase(unittest.TestCase):
+    config = TestConfig
+    
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.app = create_app(self.config)
+        self.app.config["MAX_MESSAGES_AVAILABLE"] = 2
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        
+        u = User(username="bob", email="bob@test.com", confirmed=True)
+        r = Room(name="Let's learn Flask!", creator=u, category=Category(name="Python"))
+        r.users.append(u)
+        db.session.add(r)
+        db.session.commit()
+        for i in range(4):
+            db.session.add(Message(text=f"message {i}", sender=u, room=r))
+            r.clean()
+            db.session.commit()
+            
+    def assert_roundtrip(self, path, fmt):
+        counts = export_data(path, fmt, batch_size=2)
+        self.assertEqual(counts["messages"], 2)
+        self.assertEqual(counts["message_archives"], 2)
+        
+        db.drop_all()
+        db.create_all()
+        self.assertEqual(import_data(path, fmt, batch_size=2), counts)
+        
+        u = User.query.filter_by(username="bob").first()
+        self.assertTrue(u.confirmed)
+        self.assertEqual(u.rooms.count(), 1)
+        self.assertEqual([m.text for m in MessageArchive.query.first().unpack()], ["message 0"])
+        self.assertEqual(Message.query.order_by(Message.message_id).first().text, "message 2")
+        
+    def test_jsonl_roundtrip(self):
+        self.assert_roundtrip(os.path.join(self.path, "dump.jsonl"), "jsonl")
+        
+    def test_csv_roundtrip(self):
+        self.assert_roundtrip(os.path.join(self.path, "dump"), "csv")
+        
+    def tearDown(self):
+        db.drop_all()
+        self.app_ctx.pop()
+        shutil.rmtree(self.path)
@@ -1,8 +1,21 @@
+import os
+import tempfile
 import unittest
+from gettext import GNUTranslations
 
 from chat import create_app
+from chat.autocomplete import autocomplete
+from chat.cache import LRUCache
+from chat.categories import categories
+from chat.deletion import delete_room
+from chat.i18n import compile_catalogs
 from chat.models import db, User, Room, Category, Message
-from config import TestConfig
+from chat.presence import presence
+from chat.profiles import profiles
+from chat.ratelimit import limiter
+from chat.trending import trending
+from chat.utils import message_to_json
+from config import Config, TestConfig
 
 
 class UtilsTestCase(unittest.TestCase):
@@ -49,6 +62,21 @@ class UtilsTestCase(unittest.TestCase):
         first_message = Message.query.get(first_message_id)
         self.assertTrue(first_message is None)
             
+    def test_room_is_participant(self):
+        u1 = User(username="bob", email="bob@test.com")
+        u2 = User(username="alice", email="alice@test.com")
+        c = Category(name="Python")
+        db.session.add_all([u1, u2, c])
+        db.session.commit()
+        
+        r = Room(name="Let's learn Flask!", creator=u1, category=c)
+        r.users.append(u1)
+        db.session.add(r)
+        db.session.commit()
+        
+        self.assertTrue(Room.is_participant(r.room_id, u1))
+        self.assertFalse(Room.is_participant(r.room_id, u2))
+            
     def test_room_search(self):
         u = User(username="alice", email="alice@test.com")
         c = Category(name="Flask")
@@ -63,6 +91,174 @@ class UtilsTestCase(unittest.TestCase):
         self.assertTrue(Room.search("Flask").all() is not None)
         self.assertFalse(Room.search("minecraft").all())
             
+    def test_lru_cache_eviction(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertTrue("a" in cache)
+        self.assertFalse("b" in cache)
+        self.assertEqual(len(cache), 2)
+        
+    def test_profile_cache(self):
+        u = User(username="bob", email="bob@test.com")
+        db.session.add(u)
+        db.session.commit()
+        
+        profile = profiles.get(u.user_id)
+        self.assertEqual(profile["username"], "bob")
+        self.assertEqual(profile["avatars"][25], u.gravatar_url(25))
+        self.assertTrue(profiles.get(u.user_id) is profile)
+        
+        u.name = "Bob"
+        profiles.refresh(u)
+        self.assertEqual(profiles.get(u.user_id)["name"], "Bob")
+        self.assertTrue(profiles.get(12345) is None)
+        self.assertEqual(profiles.display(12345)["username"], "deleted")
+        self.assertEqual(message_to_json(Message(text="hi", sender_id=12345))["username"], "deleted")
+            
+    def test_ping_keeps_updated_at(self):
+        u = User(username="bob", email="bob@test.com")
+        db.session.add(u)
+        db.session.commit()
+        updated_at = u.updated_at
+        u.ping()
+        db.session.commit()
+        db.session.expire_all()
+        self.assertEqual(User.query.get(u.user_id).updated_at, updated_at)
+        
+    def test_rate_limiter(self):
+        self.app.config["USER_MESSAGE_RATE"] = 0
+        self.app.config["USER_MESSAGE_BURST"] = 3
+        for i in range(3):
+            self.assertTrue(limiter.allow(1, 1))
+        self.assertFalse(limiter.allow(1, 1))
+        self.assertTrue(limiter.allow(2, 1))
+        self.assertEqual(limiter.rejections["user"], 1)
+            
+    def test_presence(self):
+        self.assertTrue(presence.join("sid1", 1, 10))
+        self.assertFalse(presence.join("sid2", 1, 10))
+        self.assertTrue(presence.join("sid3", 1, 11))
+        self.assertEqual(presence.count(1), 2)
+        self.assertTrue(presence.leave("sid1") is None)
+        self.assertEqual(presence.leave("sid2"), (1, 10))
+        self.assertFalse(presence.is_online(1, 10))
+        self.assertEqual(presence.count(1), 1)
+            
+    def test_category_registry(self):
+        python, flask = Category(name="Python"), Category(name="Flask")
+        db.session.add_all([python, flask, Room(name="Let's learn Flask!", category=flask)])
+        db.session.commit()
+        self.assertEqual(categories.choices(), [(flask.category_id, "Flask"), (python.category_id, "Python")])
+        self.assertEqual(categories.get(str(python.category_id)).name, "Python")
+        self.assertTrue(categories.get("unknown") is None)
+        self.assertEqual(categories.top(1), [(categories.get(flask.category_id), 1)])
+        self.assertEqual(categories.count(), 1)
+        
+        python.name = "Python 3"
+        db.session.add(Room(name="Asyncio", category=python))
+        db.session.commit()
+        self.assertEqual(categories.get(python.category_id).name, "Python 3")
+        self.assertEqual(categories.count(python.category_id), 1)
+        self.assertEqual(categories.count(), 2)
+        
+    def test_trending_window(self):
+        self.app.config["TRENDING_WINDOW"] = 3
+        trending.init_app(self.app)
+        now = 60 * 1000
+        for room_id, count in [(1, 3), (2, 1)]:
+            for _ in range(count):
+                trending.record(room_id, now)
+        trending.record(2, now + 60)
+        trending.record(2, now + 120)
+        self.assertEqual(trending.top(now + 120), [(2, 3), (1, 3)])
+        # Cached list is served until interval passes.
+        trending.record(1, now + 121)
+        self.assertEqual(trending.top(now + 121), [(2, 3), (1, 3)])
+        # First minute falls out of the window.
+        self.assertEqual(trending.top(now + 180), [(2, 2), (1, 1)])
+        trending.forget(2)
+        self.assertEqual(trending.top(now + 180), [(1, 1)])
+        self.assertEqual(trending.top(now + 600), [])
+        
+    def test_room_name_autocomplete(self):
+        c = Category(name="Python")
+        db.session.add_all([Room(name="Learn Flask", category=c), Room(name="Flask & Django", category=c),
+                            Room(name="Fastapi", category=c)])
+        db.session.commit()
+        names = lambda q: [name for _, name in autocomplete.complete(q)]
+        self.assertEqual(names("fla"), ["Flask & Django", "Learn Flask"])
+        self.assertEqual(names("learn FL"), ["Learn Flask"])
+        self.assertEqual(names("fa"), ["Fastapi"])
+        self.assertEqual(names("  "), [])
+        self.assertEqual(len(autocomplete.complete("f", limit=1)), 1)
+        # Created room is added to loaded index after commit.
+        room = Room(name="Flat design", category=c)
+        db.session.add(room)
+        db.session.commit()
+        self.assertEqual(names("flat"), ["Flat design"])
+        delete_room(room.room_id)
+        self.assertEqual(names("fla"), ["Flask & Django", "Learn Flask"])
+        # Rooms inserted bypassing ORM events show up after reload.
+        db.session.execute(Room.__table__.insert().values(name="Flame wars", category_id=c.category_id))
+        db.session.commit()
+        self.assertEqual(names("flame"), [])
+        autocomplete.state["loaded_at"] -= self.app.config.get("AUTOCOMPLETE_TTL", 60) + 1
+        self.assertEqual(names("flame"), ["Flame wars"])
+        
+    def test_locale_resolution(self):
+        self.assertIn(("ru", "messages"), self.app.extensions["babel"].domain_instance.cache)
+        client = self.app.test_client()
+        self.app_ctx.pop()
+        try:
+            data = client.get("/", headers={"Accept-Language": "ru-RU,ru;q=0.9"}).get_data(as_text=True)
+            self.assertIn("РУС", data)
+            self.assertEqual(self.app.extensions["locales"].get("ru-RU,ru;q=0.9"), "ru")
+            self.assertIn("ENG", client.get("/", headers={"Accept-Language": "de"}).get_data(as_text=True))
+            self.assertEqual(self.app.extensions["locales"].get("de"), "")
+        finally:
+            self.app_ctx.push()
+        
+    def test_compile_catalogs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = os.path.join(tmp, "ru", "LC_MESSAGES")
+            os.makedirs(directory)
+            with open(os.path.join(directory, "messages.po"), "w", encoding="utf-8") as f:
+                f.write('msgid ""\nmsgstr ""\n"Content-Type: text/plain; charset=UTF-8\\n"\n\n'
+                        'msgid "Search"\nmsgstr "Поиск"\n')
+            self.assertEqual(compile_catalogs(tmp), ["ru"])
+            self.assertEqual(compile_catalogs(tmp), [])
+            with open(os.path.join(directory, "messages.mo"), "rb") as f:
+                self.assertEqual(GNUTranslations(f).gettext("Search"), "Поиск")
+        
+    def test_startup_report(self):
+        app = create_app(self.config, blueprints=False, migrations=False)
+        self.assertEqual([step for step, _ in app.extensions["startup"]], ["config", "compression", "extensions"])
+        self.assertNotIn("migrate", app.extensions)
+        self.assertEqual(app.blueprints, {})
+        self.assertIn("main", self.app.blueprints)
+        
+    def test_engine_profile(self):
+        class ProfileConfig(self.config):
+            ENGINE_PROFILES = Config.ENGINE_PROFILES
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            ProfileConfig.SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(tmp, "profile.sqlite")
+            app = create_app(ProfileConfig)
+            self.assertEqual(app.config["SQLALCHEMY_ENGINE_OPTIONS"]["pool_size"], 5)
+            with app.app_context():
+                self.assertEqual(db.session.execute(db.text("PRAGMA journal_mode")).scalar(), "wal")
+                self.assertEqual(db.session.execute(db.text("PRAGMA foreign_keys")).scalar(), 1)
+                db.session.remove()
+                db.engine.dispose()
+        
+        # In-memory test database is left without profile.
+        self.assertEqual(self.app.config["SQLALCHEMY_ENGINE_OPTIONS"], {})
+        ProfileConfig.ENGINE_PROFILE = "unknown"
+        self.assertRaises(ValueError, create_app, ProfileConfig)
+        
     def tearDown(self):
         db.drop_all()
         self.app_ctx.pop()